@@ -0,0 +1,344 @@
+"""
+This code is for loading the tile images of the game.
+1. Tiles are loaded lazily, the first time they are drawn
+2. All tiles of one size live in a single atlas surface
+3. Scaled atlases are cached in memory and on disk, per tile size
+4. The atlas pixels are decoded once into a NumPy array, so whole frames are built with one gather
+5. The image of every tile state, shared by the game and the headless renderer
+"""
+
+import glob
+import hashlib
+import os
+
+import numpy as np
+import pygame
+
+# The assets folder next to this file, so the game can start from any directory
+ASSET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+# Scaled atlases are saved here so a cold start does not scale every image again
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "minesweeper")
+# Tile images in atlas order, the number tiles come first
+TILE_NAMES = [f"Tile{i}" for i in range(1, 9)] + [
+    "TileEmpty", "TileExploded", "TileFlag", "TileMine", "TileNotMine", "TileUnknown"]
+# Index of every tile image in the asset atlas
+TILE_CODES = {name: i for i, name in enumerate(TILE_NAMES)}
+# Bits of the state code of a tile, the number of adjacent mines is stored above them
+MINE_BIT, REVEALED_BIT, FLAGGED_BIT, EXPLODED_BIT, WRONG_FLAG_BIT = 1, 2, 4, 8, 16
+NUMBER_SHIFT = 5
+STATE_COUNT = 9 << NUMBER_SHIFT
+
+
+class AssetManager:
+    """
+    This class loads the tile images into one atlas surface per tile size.
+    Each tile is a subsurface of the atlas, so they all share its pixels and format.
+
+    **Attributes**
+        asset_dir: *str*
+            Folder holding the Tile*.png images
+        cache_dir: *str*
+            Folder of the disk cache, None to disable it
+        atlases: *dict[int, pygame.Surface]*
+            The atlas of every tile size loaded so far
+        tile_sets: *dict[int, dict[str, pygame.Surface]]*
+            The tiles of every tile size loaded so far, by image name
+        pixel_sets: *dict[tuple, numpy.ndarray]*
+            The decoded tile pixels of every tile size, pixel format or RGB, and background color asked for so far
+    """
+
+    def __init__(self, asset_dir=ASSET_DIR, cache_dir=CACHE_DIR):
+        """
+        AssetManager initialization. Nothing is loaded until a tile is asked for.
+
+        **Parameters**
+            asset_dir: *str*
+                Folder holding the Tile*.png images
+            cache_dir: *str*
+                Folder of the disk cache, None to disable it
+        """
+        self.asset_dir = asset_dir
+        self.cache_dir = cache_dir
+        self.atlases = {}
+        self.tile_sets = {}
+        self.pixel_sets = {}
+        self._converted = set()
+        self._source_key = None
+
+    def source_key(self):
+        """
+        Computes a key identifying the current source images, so that a disk cache
+        made from older images is never used.
+
+        **Returns**
+            *str*
+                A short hash of the names, sizes and modification times of the images
+        """
+        if self._source_key is None:
+            digest = hashlib.sha1()
+            for name in TILE_NAMES:
+                stat = os.stat(os.path.join(self.asset_dir, f"{name}.png"))
+                digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+            self._source_key = digest.hexdigest()[:12]
+        return self._source_key
+
+    def cache_path(self, tile_size):
+        """
+        Gives the disk cache file of the atlas of one tile size.
+
+        **Parameters**
+            tile_size: *int*
+                Size of the tiles in pixels
+
+        **Returns**
+            *str*
+                Path of the cached atlas image
+        """
+        return os.path.join(self.cache_dir, f"atlas_{tile_size}_{self.source_key()}.png")
+
+    def build_atlas(self, tile_size):
+        """
+        Loads and scales every tile image into a new atlas, one tile after the other
+        along x.
+
+        **Parameters**
+            tile_size: *int*
+                Size of the tiles in pixels
+
+        **Returns**
+            atlas: *pygame.Surface*
+                The atlas of all the tiles
+        """
+        atlas = pygame.Surface((tile_size * len(TILE_NAMES), tile_size), pygame.SRCALPHA)
+        for i, name in enumerate(TILE_NAMES):
+            image = pygame.image.load(os.path.join(self.asset_dir, f"{name}.png"))
+            atlas.blit(pygame.transform.scale(image, (tile_size, tile_size)), (i * tile_size, 0))
+        return atlas
+
+    def load_atlas(self, tile_size):
+        """
+        Gets the atlas of one tile size from the disk cache, or builds it and
+        saves it there, removing the atlases of that size made from older images.
+        A disk cache that cannot be written is skipped.
+
+        **Parameters**
+            tile_size: *int*
+                Size of the tiles in pixels
+
+        **Returns**
+            *pygame.Surface*
+                The atlas of all the tiles
+        """
+        if self.cache_dir is None:
+            return self.build_atlas(tile_size)
+        path = self.cache_path(tile_size)
+        if os.path.exists(path):
+            try:
+                return pygame.image.load(path)
+            except pygame.error:
+                pass
+        atlas = self.build_atlas(tile_size)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Write next to the final file first so a half written cache is never read
+            tmp_path = f"{path}.{os.getpid()}.tmp.png"
+            pygame.image.save(atlas, tmp_path)
+            os.replace(tmp_path, path)
+            self.remove_stale(tile_size)
+        except (OSError, pygame.error):
+            pass
+        return atlas
+
+    def remove_stale(self, tile_size):
+        """
+        Deletes the cached atlases of one tile size made from other versions of the images,
+        which would otherwise pile up in the cache every time the images change.
+        Files being written by another game are left alone.
+
+        **Parameters**
+            tile_size: *int*
+                Size of the tiles in pixels
+        """
+        current = self.cache_path(tile_size)
+        for path in glob.glob(os.path.join(glob.escape(self.cache_dir), f"atlas_{tile_size}_*.png")):
+            if path != current and not path.endswith(".tmp.png"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def atlas(self, tile_size):
+        """
+        Gives the atlas of one tile size, loading it on first use.
+        Once a display is open the atlas is converted to its pixel format, without
+        the alpha channel if every pixel is opaque, so blits are as fast as possible.
+
+        **Parameters**
+            tile_size: *int*
+                Size of the tiles in pixels
+
+        **Returns**
+            *pygame.Surface*
+                The atlas of all the tiles
+        """
+        atlas = self.atlases.get(tile_size)
+        if atlas is None:
+            atlas = self.atlases[tile_size] = self.load_atlas(tile_size)
+            self.tile_sets.pop(tile_size, None)
+        if tile_size not in self._converted and pygame.display.get_surface() is not None:
+            if atlas.get_flags() & pygame.SRCALPHA and pygame.surfarray.pixels_alpha(atlas).min() < 255:
+                atlas = atlas.convert_alpha()
+            else:
+                atlas = atlas.convert()
+            self.atlases[tile_size] = atlas
+            self.tile_sets.pop(tile_size, None)
+            self._converted.add(tile_size)
+        return atlas
+
+    def tiles(self, tile_size):
+        """
+        Gives all the tiles of one size.
+
+        **Parameters**
+            tile_size: *int*
+                Size of the tiles in pixels
+
+        **Returns**
+            *dict[str, pygame.Surface]*
+                The tiles by image name, such as "TileMine"
+        """
+        tile_set = self.tile_sets.get(tile_size)
+        if tile_set is None or tile_size not in self._converted:
+            atlas = self.atlas(tile_size)
+            tile_set = self.tile_sets.get(tile_size)
+            if tile_set is None:
+                tile_set = self.tile_sets[tile_size] = {
+                    name: atlas.subsurface((i * tile_size, 0, tile_size, tile_size))
+                    for i, name in enumerate(TILE_NAMES)}
+        return tile_set
+
+    def tile(self, name, tile_size):
+        """
+        Gives one tile.
+
+        **Parameters**
+            name: *str*
+                Name of the image, such as "TileMine"
+            tile_size: *int*
+                Size of the tile in pixels
+
+        **Returns**
+            *pygame.Surface*
+                The tile
+        """
+        return self.tiles(tile_size)[name]
+
+    def pixels(self, tile_size, surface, background=(0, 0, 0)):
+        """
+        Gives the pixels of all the tiles of one size as one array, indexed like TILE_NAMES,
+        already mapped to the pixel format of a surface so they can be copied straight into it.
+        Each tile is stored row by row, y first, the way a surface lays out its pixels in memory.
+        Transparent pixels are blended over the background color, as blitting the tile over it would.
+
+        **Parameters**
+            tile_size: *int*
+                Size of the tiles in pixels
+            surface: *pygame.Surface*
+                A surface of the pixel format the tiles are drawn on
+            background: *tuple*
+                Color under the tiles
+
+        **Returns**
+            *numpy.ndarray*
+                Array of shape (len(TILE_NAMES), tile_size, tile_size), indexed [tile, y, x]
+        """
+        key = (tile_size, surface.get_bitsize(), surface.get_masks(), tuple(background))
+        pixels = self.pixel_sets.get(key)
+        if pixels is None:
+            atlas = self.atlas(tile_size)
+            flat = pygame.Surface(atlas.get_size(), 0, surface)
+            flat.fill(background)
+            flat.blit(atlas, (0, 0))
+            # the atlas holds the tiles one after the other along x
+            pixels = pygame.surfarray.array2d(flat).reshape(len(TILE_NAMES), tile_size, tile_size)
+            pixels = self.pixel_sets[key] = np.ascontiguousarray(pixels.transpose(0, 2, 1))
+        return pixels
+
+    def rgb(self, tile_size, background=(0, 0, 0)):
+        """
+        Gives the colors of all the tiles of one size as one array, indexed like TILE_NAMES,
+        for building images without any surface. Transparent pixels are blended over the background color.
+
+        **Parameters**
+            tile_size: *int*
+                Size of the tiles in pixels
+            background: *tuple*
+                Color under the tiles
+
+        **Returns**
+            *numpy.ndarray[uint8]*
+                Array of shape (len(TILE_NAMES), tile_size, tile_size, 3), indexed [tile, y, x, channel]
+        """
+        key = (tile_size, "rgb", tuple(background))
+        pixels = self.pixel_sets.get(key)
+        if pixels is None:
+            flat = pygame.Surface((tile_size * len(TILE_NAMES), tile_size), 0, 32)
+            flat.fill(background)
+            flat.blit(self.atlas(tile_size), (0, 0))
+            pixels = pygame.surfarray.array3d(flat).reshape(len(TILE_NAMES), tile_size, tile_size, 3)
+            pixels = self.pixel_sets[key] = np.ascontiguousarray(pixels.transpose(0, 2, 1, 3))
+        return pixels
+
+
+def tile_codes(state):
+    """
+    Finds which image shows each tile, as an index in TILE_NAMES.
+    A flag hides whatever is under it.
+
+    **Parameters**
+        state: *dict[str, numpy.ndarray]*
+            The mine, adjacent, revealed, flagged, exploded and wrong_flag arrays of the tiles
+
+    **Returns**
+        codes: *numpy.ndarray[int]*
+            The image index of every tile
+    """
+    adjacent = state["adjacent"]
+    codes = np.where(adjacent > 0, adjacent.astype(np.intp) + TILE_CODES["Tile1"] - 1, TILE_CODES["TileEmpty"])
+    codes[state["mine"]] = TILE_CODES["TileMine"]
+    codes[state["wrong_flag"]] = TILE_CODES["TileNotMine"]
+    codes[state["exploded"]] = TILE_CODES["TileExploded"]
+    codes[~state["revealed"]] = TILE_CODES["TileUnknown"]
+    codes[state["flagged"]] = TILE_CODES["TileFlag"]
+    return codes
+
+
+def state_code(mine, adjacent, revealed, flagged, exploded, wrong_flag):
+    """
+    Packs the state of tiles into one integer per tile: the number of adjacent mines
+    in the high bits and one bit per flag below it. Works on single values and on arrays.
+
+    **Parameters**
+        mine, revealed, flagged, exploded, wrong_flag: *bool or numpy.ndarray[bool]*
+            The state flags of the tiles
+        adjacent: *int or numpy.ndarray[int]*
+            Number of mines around the tiles, 0 to 8
+
+    **Returns**
+        *int or numpy.ndarray[int]*
+            The state code of every tile, below STATE_COUNT
+    """
+    return (adjacent << NUMBER_SHIFT | mine * MINE_BIT | revealed * REVEALED_BIT | flagged * FLAGGED_BIT
+            | exploded * EXPLODED_BIT | wrong_flag * WRONG_FLAG_BIT)
+
+
+# Image index of every state code, shared by every tile
+_codes = np.arange(STATE_COUNT)
+STATE_TILES = tile_codes({"adjacent": _codes >> NUMBER_SHIFT, "mine": (_codes & MINE_BIT) > 0,
+                          "revealed": (_codes & REVEALED_BIT) > 0, "flagged": (_codes & FLAGGED_BIT) > 0,
+                          "exploded": (_codes & EXPLODED_BIT) > 0, "wrong_flag": (_codes & WRONG_FLAG_BIT) > 0})
+del _codes
+
+
+# The asset manager shared by the game
+manager = AssetManager()
@@ -0,0 +1,313 @@
+"""
+This code plays many Minesweeper games headless, to measure difficulty and players.
+1. A player policy picks the next move from the state of a MineField
+2. Games are seeded and spread over a pool of worker processes
+3. Results are streamed to a JSON lines file, one line per game
+
+Usage:
+    python batch.py --games 10000 --rows 30 --cols 16 --mines 99 --policy random --out results.jsonl
+"""
+
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from engine import MineField
+from probability import probability_policy
+from solver import solver_policy
+
+
+def random_policy(field, rng):
+    """
+    A player that uncovers a random tile which is neither revealed nor flagged.
+
+    **Parameters**
+        field: *MineField*
+            The board being played
+        rng: *numpy.random.Generator*
+            Random generator of the player
+
+    **Returns**
+        *tuple[str, int, int]*
+            The move: "reveal" or "flag", and the coordinates of the tile
+    """
+    closed = np.flatnonzero(~field.revealed & ~field.flagged)
+    x, y = divmod(int(closed[rng.integers(closed.size)]), field.cols)
+    return "reveal", x, y
+
+
+# Policies that can be named on the command line without a module path
+POLICIES = {
+    "probability": probability_policy,
+    "random": random_policy,
+    "solver": solver_policy,
+}
+
+
+def load_policy(spec):
+    """
+    Finds a policy from its name, or from "module:function" for a policy defined elsewhere.
+
+    **Parameters**
+        spec: *str*
+            Name of the policy
+
+    **Returns**
+        *callable*
+            The policy
+
+    **Raises**
+        ValueError
+            If the policy is unknown
+    """
+    if spec in POLICIES:
+        return POLICIES[spec]
+    if ":" in spec:
+        module_name, function_name = spec.split(":", 1)
+        return getattr(importlib.import_module(module_name), function_name)
+    raise ValueError(f"Unknown policy {spec!r}, use one of {sorted(POLICIES)} or module:function")
+
+
+def play_policy(field, policy, rng, max_moves):
+    """
+    Lets a policy play a board until the game ends or a number of moves is reached.
+
+    **Parameters**
+        field: *MineField*
+            The board being played
+        policy: *callable*
+            The player, see random_policy
+        rng: *numpy.random.Generator*
+            Random generator of the player
+        max_moves: *int*
+            Moves after which the game is stopped
+
+    **Returns**
+        moves: *int*
+            Number of moves played
+    """
+    moves = 0
+    while not (field.won or field.lost) and moves < max_moves:
+        action, x, y = policy(field, rng)
+        moves += 1
+        field.play_move(x, y, action == "flag")
+    return moves
+
+
+def play_game(seed, rows, cols, mines, policy, max_moves=None):
+    """
+    Plays one game to the end with a policy.
+    The first move places the mines around it, as in the interactive game.
+
+    **Parameters**
+        seed: *int*
+            Seed of the board and of the player
+        rows: *int*
+            Number of tiles along x
+        cols: *int*
+            Number of tiles along y
+        mines: *int*
+            Number of mines
+        policy: *callable*
+            The player, see random_policy
+        max_moves: *int*
+            Moves after which the game is stopped, default to the number of tiles
+
+    **Returns**
+        *dict*
+            seed, outcome ("won", "lost" or "stopped"), moves, revealed tiles and wall time in seconds
+    """
+    start = time.perf_counter()
+    field = MineField(rows, cols, mines, seed)
+    rng = np.random.default_rng([seed, 1])
+    moves = play_policy(field, policy, rng, rows * cols if max_moves is None else max_moves)
+    outcome = "won" if field.won else ("lost" if field.lost else "stopped")
+    return {
+        "seed": seed,
+        "outcome": outcome,
+        "moves": moves,
+        "revealed": rows * cols - mines - field.safe_remaining,
+        "time": time.perf_counter() - start,
+    }
+
+
+def play_games(seeds, rows, cols, mines, policy_spec, max_moves=None):
+    """
+    Plays a group of games in a worker process.
+
+    **Parameters**
+        seeds: *list[int]*
+            One seed per game
+        rows: *int*
+            Number of tiles along x
+        cols: *int*
+            Number of tiles along y
+        mines: *int*
+            Number of mines
+        policy_spec: *str*
+            Name of the policy, see load_policy
+        max_moves: *int*
+            Moves after which a game is stopped
+
+    **Returns**
+        *list[dict]*
+            The result of every game, see play_game
+    """
+    policy = load_policy(policy_spec)
+    return [play_game(seed, rows, cols, mines, policy, max_moves) for seed in seeds]
+
+
+def plan_batch(games, policy, workers=None, group_size=None, largest=1000):
+    """
+    Checks the policy of a batch and picks how its games are spread over the workers.
+
+    **Parameters**
+        games: *int*
+            Number of games
+        policy: *str*
+            Name of the policy, see load_policy
+        workers: *int*
+            Number of worker processes, default to the number of CPUs
+        group_size: *int*
+            Games per group sent to a worker, default to spread games evenly over 4 groups per worker
+        largest: *int*
+            Most games per group when the size is not given
+
+    **Returns**
+        workers: *int*
+            Number of worker processes
+        group_size: *int*
+            Games per group
+
+    **Raises**
+        ValueError
+            If the policy is unknown
+    """
+    load_policy(policy)  # fail early on an unknown policy
+    workers = workers or os.cpu_count() or 1
+    return workers, group_size or max(1, min(largest, games // (4 * workers)))
+
+
+def run_batch(games, rows, cols, mines, policy="random", workers=None, first_seed=0,
+              out=None, group_size=None, max_moves=None):
+    """
+    Plays seeded games over a pool of processes and streams the results.
+    Games go to the workers in groups, so the cost of sending work stays small
+    next to the cost of playing.
+
+    **Parameters**
+        games: *int*
+            Number of games
+        rows: *int*
+            Number of tiles along x
+        cols: *int*
+            Number of tiles along y
+        mines: *int*
+            Number of mines
+        policy: *str*
+            Name of the policy, see load_policy
+        workers: *int*
+            Number of worker processes, default to the number of CPUs.
+            With 1 the games are played in this process.
+        first_seed: *int*
+            Seed of the first game, the next games use the following seeds
+        out: *file*
+            Text file the JSON line of every game is written to, as games finish
+        group_size: *int*
+            Games per group sent to a worker, default to spread games evenly over 4 groups per worker
+        max_moves: *int*
+            Moves after which a game is stopped
+
+    **Returns**
+        summary: *dict*
+            Number of games, wins, losses, wall time and games per second
+    """
+    workers, group_size = plan_batch(games, policy, workers, group_size)
+    seeds = list(range(first_seed, first_seed + games))
+    groups = [seeds[i:i + group_size] for i in range(0, games, group_size)]
+    summary = {"games": 0, "won": 0, "lost": 0, "stopped": 0}
+    start = time.perf_counter()
+    args = (rows, cols, mines, policy, max_moves)
+    if workers == 1:
+        results = (play_games(group, *args) for group in groups)
+        summary.update(collect(results, summary, out))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(play_games, group, *args) for group in groups]
+            summary.update(collect((future.result() for future in futures), summary, out))
+    summary["wall_time"] = time.perf_counter() - start
+    summary["games_per_second"] = summary["games"] / summary["wall_time"] if summary["wall_time"] else 0.0
+    return summary
+
+
+def collect(results, summary, out):
+    """
+    Counts the outcomes of groups of games as they come and writes them out.
+
+    **Parameters**
+        results: *iterable[list[dict]]*
+            The results of every group of games
+        summary: *dict*
+            The counts to update
+        out: *file*
+            Text file the JSON lines are written to, None to skip
+
+    **Returns**
+        summary: *dict*
+            The updated counts
+    """
+    for group in results:
+        for result in group:
+            summary["games"] += 1
+            summary[result["outcome"]] += 1
+            if out is not None:
+                out.write(json.dumps(result) + "\n")
+        if out is not None:
+            out.flush()
+    return summary
+
+
+def main(argv=None):
+    """
+    Command line entry point of the batch runner.
+
+    **Parameters**
+        argv: *list[str]*
+            Command line arguments, default to sys.argv
+
+    **Returns**
+        summary: *dict*
+            The summary of the batch, also printed
+    """
+    parser = argparse.ArgumentParser(description="Play many seeded Minesweeper games headless.")
+    parser.add_argument("--games", type=int, default=1000, help="number of games")
+    parser.add_argument("--rows", type=int, default=15, help="number of tiles along x")
+    parser.add_argument("--cols", type=int, default=15, help="number of tiles along y")
+    parser.add_argument("--mines", type=int, default=20, help="number of mines")
+    parser.add_argument("--policy", default="random", help=f"one of {sorted(POLICIES)} or module:function")
+    parser.add_argument("--workers", type=int, help="worker processes, default to the number of CPUs")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("--max-moves", type=int, help="moves after which a game is stopped")
+    parser.add_argument("--out", help="JSON lines file of per game results")
+    args = parser.parse_args(argv)
+    out = open(args.out, "w") if args.out else None
+    try:
+        summary = run_batch(args.games, args.rows, args.cols, args.mines, args.policy, args.workers,
+                            args.seed, out, max_moves=args.max_moves)
+    finally:
+        if out is not None:
+            out.close()
+    print(f"{summary['games']} games, {summary['won']} won, {summary['lost']} lost, "
+          f"{summary['stopped']} stopped in {summary['wall_time']:.2f} s "
+          f"({summary['games_per_second']:.1f} games/s)", file=sys.stderr)
+    return summary
+
+
+if __name__ == "__main__":
+    main()
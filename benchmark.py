@@ -0,0 +1,326 @@
+"""
+This code benchmarks the board operations and the drawing of the game.
+1. Seeded boards from 15x15 up to 2000x2000, at several mine densities
+2. Each operation is timed several times on a fresh state, the minimum and median are kept
+3. Results are written as JSON and can be compared to a saved baseline to catch regressions
+
+Usage:
+    python benchmark.py --out bench_output.txt
+    python benchmark.py --baseline bench_output.txt
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+# Frames are drawn without a window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+
+from engine import MineField
+import main
+
+# Board sizes and mine densities benchmarked by default
+SIZES = [(15, 15), (100, 100), (500, 500), (2000, 2000)]
+DENSITIES = [0.1, 0.2]
+# A median this many times the baseline one is reported as a regression
+THRESHOLD = 1.25
+
+
+def measure(run, setup=None, repeat=5):
+    """
+    Times an operation, each run on a fresh state made by setup.
+
+    **Parameters**
+        run: *callable*
+            The operation, called with the state made by setup
+        setup: *callable*
+            Makes the state of one run, not timed
+        repeat: *int*
+            Number of runs
+
+    **Returns**
+        *list[float]*
+            The time of every run in seconds
+    """
+    times = []
+    for _ in range(repeat):
+        state = setup() if setup is not None else None
+        start = time.perf_counter()
+        run(state)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def first_click(rows, cols):
+    """
+    Gives the tile of the first click of every benchmark, the middle of the board.
+    """
+    return rows // 2, cols // 2
+
+
+def played_board(cls, rows, cols, mines, seed):
+    """
+    Makes a board with its mines placed and the first click uncovered.
+
+    **Parameters**
+        cls: *type*
+            MineField or main.GameBoard
+        rows: *int*
+            Number of tiles along x
+        cols: *int*
+            Number of tiles along y
+        mines: *int*
+            Number of mines
+        seed: *int*
+            Seed of the board
+
+    **Returns**
+        *MineField*
+            The board
+    """
+    board = cls(rows, cols, mines, seed)
+    board.place_mines_post_first_click(*first_click(rows, cols))
+    board.uncover(*first_click(rows, cols))
+    return board
+
+
+def closed_number(board):
+    """
+    Finds a tile with a number which is not revealed yet, to uncover without a cascade.
+
+    **Parameters**
+        board: *MineField*
+            The board
+
+    **Returns**
+        *tuple[int, int]*
+            Coordinates of the tile
+    """
+    candidates = np.flatnonzero(((board.adjacent > 0) & ~board.mine & ~board.revealed).ravel())
+    return divmod(int(candidates[0]), board.cols)
+
+
+def benchmarks(rows, cols, mines, seed, game):
+    """
+    Lists the operations timed on one board configuration.
+
+    **Parameters**
+        rows: *int*
+            Number of tiles along x
+        cols: *int*
+            Number of tiles along y
+        mines: *int*
+            Number of mines
+        seed: *int*
+            Seed of the boards
+        game: *main.PygameGame*
+            The game whose frames are timed, already sized for the board
+
+    **Returns**
+        *dict[str, tuple[callable, callable]]*
+            The setup and run of every operation, by name
+    """
+    click = first_click(rows, cols)
+
+    def fresh():
+        return MineField(rows, cols, mines, seed)
+
+    def prepared():
+        field = fresh()
+        field.prepare_mines()
+        return field
+
+    def placed():
+        field = fresh()
+        field.place_mines_post_first_click(*click)
+        return field
+
+    def played():
+        return played_board(MineField, rows, cols, mines, seed)
+
+    def number_found():
+        field = played()
+        return field, closed_number(field)
+
+    def check_victory(field):
+        for _ in range(1000):
+            field.won
+
+    def drawn():
+        board = played_board(main.GameBoard, rows, cols, mines, seed)
+        board.make_board(game.screen, game.camera)
+        board.uncover(*closed_number(board))
+        return board
+
+    def stale():
+        board = played_board(main.GameBoard, rows, cols, mines, seed)
+        board.view_stale = True
+        return board
+
+    def game_started():
+        game.start_new_game()
+        game.left_click_action(*click)
+        return game
+
+    def game_clicked():
+        game_started()
+        game.update_screen()
+        game.render_timer()
+        game.left_click_action(*closed_number(game.board))
+        return game
+
+    def frame(g):
+        g.update_screen()
+        g.render_timer()
+
+    return {
+        "place_mines": (fresh, lambda field: field.place_mines_post_first_click(*click)),
+        "place_mines_prepared": (prepared, lambda field: field.place_mines_post_first_click(*click)),
+        "put_numbers": (placed, lambda field: field.put_numbers()),
+        "uncover_first_click": (placed, lambda field: field.uncover(*click)),
+        "uncover_number": (number_found, lambda state: state[0].uncover(*state[1])),
+        "check_victory_x1000": (played, check_victory),
+        "make_board_full_view": (stale, lambda board: board.make_board(game.screen, game.camera)),
+        "make_board_one_tile": (drawn, lambda board: board.make_board(game.screen, game.camera)),
+        "frame_first": (game_started, frame),
+        "frame_after_click": (game_clicked, frame),
+    }
+
+
+def run_suite(sizes=SIZES, densities=DENSITIES, repeat=5, seed=0, only=None, log=None):
+    """
+    Runs every benchmark on every board configuration.
+
+    **Parameters**
+        sizes: *list[tuple[int, int]]*
+            Board sizes, rows by cols
+        densities: *list[float]*
+            Mine densities, as a fraction of the tiles
+        repeat: *int*
+            Runs of every operation
+        seed: *int*
+            Seed of the boards
+        only: *list[str]*
+            Names of the operations to run, all of them if not given
+        log: *file*
+            Text file progress is printed to, None for no progress
+
+    **Returns**
+        *dict*
+            The environment and the results, ready to be written as JSON
+    """
+    results = []
+    for rows, cols in sizes:
+        # no board is built in the background, it would compete with the timings
+        game = main.PygameGame(rows, cols, 0, seed=seed, prepare_boards=False)
+        for density in densities:
+            mines = int(rows * cols * density)
+            game.mines = mines
+            case = f"{rows}x{cols}@{density:g}"
+            for name, (setup, run) in benchmarks(rows, cols, mines, seed, game).items():
+                if only and name not in only:
+                    continue
+                times = measure(run, setup, repeat)
+                results.append({"case": case, "op": name, "min": min(times),
+                                "median": statistics.median(times), "runs": repeat})
+                if log is not None:
+                    print(f"{case:>18} {name:<22} min {min(times) * 1000:9.3f} ms  "
+                          f"median {statistics.median(times) * 1000:9.3f} ms", file=log)
+    return {
+        "meta": {"python": platform.python_version(), "numpy": np.__version__, "pygame": pygame.version.ver,
+                 "machine": platform.machine(), "system": platform.system(), "seed": seed, "repeat": repeat},
+        "results": results,
+    }
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """
+    Compares results to a baseline run.
+
+    **Parameters**
+        results: *dict*
+            Results of run_suite
+        baseline: *dict*
+            Results of an earlier run_suite
+        threshold: *float*
+            Ratio of the medians above which an operation is a regression
+
+    **Returns**
+        *list[dict]*
+            Every operation found in both runs, with the ratio of its medians and whether it regressed
+    """
+    before = {(r["case"], r["op"]): r for r in baseline["results"]}
+    rows = []
+    for result in results["results"]:
+        old = before.get((result["case"], result["op"]))
+        if old is None or old["median"] <= 0:
+            continue
+        ratio = result["median"] / old["median"]
+        rows.append({"case": result["case"], "op": result["op"], "baseline": old["median"],
+                     "median": result["median"], "ratio": ratio, "regression": ratio > threshold})
+    return rows
+
+
+def parse_sizes(text):
+    """
+    Reads board sizes such as "15x15,500x500" or "100" for a square board.
+    """
+    sizes = []
+    for item in text.split(","):
+        rows, _, cols = item.partition("x")
+        sizes.append((int(rows), int(cols or rows)))
+    return sizes
+
+
+def main_cli(argv=None):
+    """
+    Command line entry point of the benchmark suite.
+
+    **Parameters**
+        argv: *list[str]*
+            Command line arguments, default to sys.argv
+
+    **Returns**
+        *int*
+            Exit status: 1 if a regression was found against the baseline, 0 otherwise
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the Minesweeper board operations and frames.")
+    parser.add_argument("--sizes", type=parse_sizes, default=SIZES, help="board sizes, such as 15x15,500x500")
+    parser.add_argument("--densities", type=lambda text: [float(d) for d in text.split(",")], default=DENSITIES,
+                        help="mine densities, such as 0.1,0.2")
+    parser.add_argument("--repeat", type=int, default=5, help="runs of every operation")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the boards")
+    parser.add_argument("--only", help="comma separated names of the operations to run")
+    parser.add_argument("--out", help="JSON file the results are written to, default to the standard output")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="median ratio counted as a regression")
+    args = parser.parse_args(argv)
+    results = run_suite(args.sizes, args.densities, args.repeat, args.seed,
+                        args.only.split(",") if args.only else None, log=sys.stderr)
+    text = json.dumps(results, indent=1)
+    if args.out:
+        with open(args.out, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+    if not args.baseline:
+        return 0
+    with open(args.baseline) as file:
+        comparison = compare(results, json.load(file), args.threshold)
+    regressions = [row for row in comparison if row["regression"]]
+    for row in comparison:
+        mark = "REGRESSION" if row["regression"] else ""
+        print(f"{row['case']:>18} {row['op']:<22} {row['ratio']:6.2f}x {mark}", file=sys.stderr)
+    print(f"{len(regressions)} regression(s) out of {len(comparison)} operations", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,178 @@
+"""
+This code is for the camera looking at the game board.
+1. Scrolling (panning) and zooming over a board larger than the window
+2. Mapping between screen pixels and board tiles
+3. The range of tiles visible on screen, so only those are drawn
+"""
+
+# Tile sizes the camera zooms through, in pixels
+ZOOM_LEVELS = [8, 12, 16, 24, 32, 48, 64]
+
+
+class Camera:
+    """
+    This class is a scrollable and zoomable view over the board.
+    The view shows the board from the world pixel (x, y), where a tile is
+    tile_size pixels wide, so tile (i, j) is drawn at (i * tile_size - x, j * tile_size - y).
+
+    **Attributes**
+        width: *int*
+            Width of the view in pixels
+        height: *int*
+            Height of the view in pixels
+        tile_size: *int*
+            Size of a tile on screen in pixels, the zoom level
+        x: *int*
+            World pixel shown at the left edge of the view
+        y: *int*
+            World pixel shown at the top edge of the view
+        rows: *int*
+            Number of tiles along x the view is kept over, None for an endless board
+        cols: *int*
+            Number of tiles along y the view is kept over, None for an endless board
+    """
+
+    def __init__(self, width, height, tile_size, rows=None, cols=None):
+        """
+        Camera initialization, looking at the top left corner of the board.
+
+        **Parameters**
+            width: *int*
+                Width of the view in pixels
+            height: *int*
+                Height of the view in pixels
+            tile_size: *int*
+                Size of a tile on screen in pixels
+            rows: *int*
+                Number of tiles along x of the board, None for an endless board
+            cols: *int*
+                Number of tiles along y of the board, None for an endless board
+        """
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        self.rows = rows
+        self.cols = cols
+        self.x = 0
+        self.y = 0
+
+    @property
+    def state(self):
+        """
+        Everything that decides what the view shows, to tell when it has to be drawn again.
+        """
+        return self.x, self.y, self.tile_size, self.width, self.height
+
+    def clamp(self):
+        """
+        Keeps the view over the board. A board smaller than the view stays in the top left corner.
+        """
+        if self.rows is not None:
+            self.x = max(0, min(self.x, self.rows * self.tile_size - self.width))
+        if self.cols is not None:
+            self.y = max(0, min(self.y, self.cols * self.tile_size - self.height))
+
+    def pan(self, dx, dy):
+        """
+        Moves the view.
+
+        **Parameters**
+            dx: *int*
+                Pixels to move to the right
+            dy: *int*
+                Pixels to move down
+        """
+        self.x += int(dx)
+        self.y += int(dy)
+        self.clamp()
+
+    def center_on(self, tile_x, tile_y):
+        """
+        Moves the view so that a tile is in its middle.
+
+        **Parameters**
+            tile_x: *int*
+                x index of the tile
+            tile_y: *int*
+                y index of the tile
+        """
+        self.x = tile_x * self.tile_size + self.tile_size // 2 - self.width // 2
+        self.y = tile_y * self.tile_size + self.tile_size // 2 - self.height // 2
+        self.clamp()
+
+    def zoom(self, steps, anchor=None):
+        """
+        Zooms in or out through ZOOM_LEVELS, keeping the board point under the anchor still.
+
+        **Parameters**
+            steps: *int*
+                Number of levels to zoom in, negative to zoom out
+            anchor: *tuple[int, int]*
+                Screen position kept still, default to the middle of the view
+
+        **Returns**
+            *bool*
+                True if the zoom level changed
+        """
+        if self.tile_size in ZOOM_LEVELS:
+            level = ZOOM_LEVELS.index(self.tile_size)
+        else:
+            level = min(range(len(ZOOM_LEVELS)), key=lambda i: abs(ZOOM_LEVELS[i] - self.tile_size))
+        new_size = ZOOM_LEVELS[max(0, min(level + steps, len(ZOOM_LEVELS) - 1))]
+        if new_size == self.tile_size:
+            return False
+        ax, ay = anchor if anchor is not None else (self.width // 2, self.height // 2)
+        self.x = (self.x + ax) * new_size // self.tile_size - ax
+        self.y = (self.y + ay) * new_size // self.tile_size - ay
+        self.tile_size = new_size
+        self.clamp()
+        return True
+
+    def screen_to_tile(self, sx, sy):
+        """
+        Finds the tile under a screen position.
+
+        **Parameters**
+            sx: *int*
+                x pixel on screen
+            sy: *int*
+                y pixel on screen
+
+        **Returns**
+            *tuple[int, int]*
+                Indices of the tile, which may be outside the board
+        """
+        return (self.x + sx) // self.tile_size, (self.y + sy) // self.tile_size
+
+    def tile_to_screen(self, tile_x, tile_y):
+        """
+        Finds where a tile is drawn on screen.
+
+        **Parameters**
+            tile_x: *int*
+                x index of the tile
+            tile_y: *int*
+                y index of the tile
+
+        **Returns**
+            *tuple[int, int]*
+                Screen position of the top left corner of the tile
+        """
+        return tile_x * self.tile_size - self.x, tile_y * self.tile_size - self.y
+
+    def visible_tiles(self):
+        """
+        Gives the range of tiles at least partly inside the view, clipped to the board.
+
+        **Returns**
+            *tuple[int, int, int, int]*
+                x0, x1, y0, y1 such that tiles x0 <= x < x1 and y0 <= y < y1 are visible
+        """
+        x0, y0 = self.screen_to_tile(0, 0)
+        x1 = (self.x + self.width - 1) // self.tile_size + 1
+        y1 = (self.y + self.height - 1) // self.tile_size + 1
+        if self.rows is not None:
+            x0, x1 = max(0, x0), min(self.rows, x1)
+        if self.cols is not None:
+            y0, y1 = max(0, y0), min(self.cols, y1)
+        return x0, max(x0, x1), y0, max(y0, y1)
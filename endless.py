@@ -0,0 +1,573 @@
+"""
+This code is the game engine of the endless Minesweeper mode.
+1. The board has no edge: it is split into square chunks made on demand
+2. The mines of a chunk come from a hash of (seed, chunk coordinates)
+3. Chunks not used for a while are evicted to a compact on-disk store
+
+Like the engine module it has no pygame dependency. Memory stays bounded:
+at most max_chunks chunks are kept in memory, whatever the player explores.
+"""
+
+import dbm
+import os
+import shutil
+import struct
+import tempfile
+import weakref
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from engine import box_sum
+
+# Size of a chunk in tiles along x and y
+CHUNK_SIZE = 32
+# Fraction of the tiles holding a mine
+DEFAULT_DENSITY = 0.16
+# Chunks kept in memory before the least recently used ones are evicted
+MAX_CHUNKS = 256
+
+
+class Chunk:
+    """
+    This class holds the tiles of one chunk of an endless board, indexed by [x, y]
+    relative to the chunk corner.
+
+    **Attributes**
+        mine: *numpy.ndarray[bool]*
+            Whether a tile holds a mine
+        adjacent: *numpy.ndarray[uint8]*
+            The number of mines around each tile, including mines of the neighbor chunks
+        revealed: *numpy.ndarray[bool]*
+            Whether a tile is revealed
+        flagged: *numpy.ndarray[bool]*
+            Whether a tile is flagged
+        exploded: *numpy.ndarray[bool]*
+            Whether a tile is the mine that exploded
+        wrong_flag: *numpy.ndarray[bool]*
+            Whether a tile was wrongly flagged, shown when the game is lost
+    """
+
+    __slots__ = ("mine", "adjacent", "revealed", "flagged", "exploded", "wrong_flag")
+    # The state that cannot be generated again and has to be stored
+    STATE = ("revealed", "flagged", "exploded", "wrong_flag")
+
+    def __init__(self, mine, adjacent, state=None):
+        """
+        Chunk initialization.
+
+        **Parameters**
+            mine: *numpy.ndarray[bool]*
+                The mines of the chunk
+            adjacent: *numpy.ndarray[uint8]*
+                The numbers of the chunk
+            state: *numpy.ndarray[bool]*
+                The stored state planes in STATE order, all False if not given
+        """
+        self.mine = mine
+        self.adjacent = adjacent
+        if state is None:
+            state = np.zeros((len(self.STATE),) + mine.shape, dtype=bool)
+        for name, plane in zip(self.STATE, state):
+            setattr(self, name, plane)
+
+    @property
+    def touched(self):
+        """
+        Whether the player changed anything in this chunk.
+        """
+        return bool(self.revealed.any() or self.flagged.any())
+
+    def pack(self):
+        """
+        Packs the state of the chunk into bytes: one bit per tile and plane, compressed.
+
+        **Returns**
+            *bytes*
+                The packed state
+        """
+        planes = np.stack([getattr(self, name) for name in self.STATE])
+        return zlib.compress(np.packbits(planes).tobytes())
+
+    @classmethod
+    def unpack_state(cls, data, size):
+        """
+        Unpacks the state written by pack.
+
+        **Parameters**
+            data: *bytes*
+                The packed state
+            size: *int*
+                The chunk size
+
+        **Returns**
+            *numpy.ndarray[bool]*
+                The state planes in STATE order
+        """
+        bits = np.unpackbits(np.frombuffer(zlib.decompress(data), dtype=np.uint8))
+        count = len(cls.STATE) * size * size
+        return bits[:count].astype(bool).reshape(len(cls.STATE), size, size)
+
+
+class ChunkStore:
+    """
+    This class is the on-disk store of evicted chunks, a key-value database
+    mapping chunk coordinates to the packed chunk state.
+
+    **Attributes**
+        path: *str*
+            Path of the database
+        db: *dbm database*
+            The open database
+    """
+
+    def __init__(self, path=None):
+        """
+        ChunkStore initialization.
+
+        **Parameters**
+            path: *str*
+                Path of the database, a temporary one removed by close() if not given
+        """
+        tmp_dir = None
+        if path is None:
+            tmp_dir = tempfile.mkdtemp(prefix="minesweeper-chunks-")
+            path = os.path.join(tmp_dir, "chunks")
+        self.path = path
+        self.db = dbm.open(path, "c")
+        # the store is closed, and a temporary one removed, with this object or at exit at the latest
+        self._cleanup = weakref.finalize(self, self.release, self.db, tmp_dir)
+
+    @staticmethod
+    def release(db, tmp_dir):
+        """
+        Closes a database and removes its temporary folder.
+
+        **Parameters**
+            db: *dbm database*
+                The database to close
+            tmp_dir: *str*
+                The temporary folder of the database, None if it is not temporary
+        """
+        db.close()
+        if tmp_dir is not None:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    @staticmethod
+    def key(cx, cy):
+        """
+        Gives the database key of a chunk.
+
+        **Parameters**
+            cx: *int*
+                x index of the chunk
+            cy: *int*
+                y index of the chunk
+
+        **Returns**
+            *bytes*
+                The key
+        """
+        return struct.pack("<qq", cx, cy)
+
+    def save(self, cx, cy, data):
+        """
+        Writes the packed state of a chunk.
+
+        **Parameters**
+            cx: *int*
+                x index of the chunk
+            cy: *int*
+                y index of the chunk
+            data: *bytes*
+                The packed state
+        """
+        self.db[self.key(cx, cy)] = data
+
+    def load(self, cx, cy):
+        """
+        Reads the packed state of a chunk.
+
+        **Parameters**
+            cx: *int*
+                x index of the chunk
+            cy: *int*
+                y index of the chunk
+
+        **Returns**
+            *bytes*
+                The packed state, None if the chunk was never stored
+        """
+        return self.db.get(self.key(cx, cy))
+
+    def close(self):
+        """
+        Closes the database, and removes it if it was a temporary one.
+        """
+        self._cleanup()
+
+
+class EndlessField:
+    """
+    This class holds the state of an endless Minesweeper board and applies the rules of the game.
+    Tiles are addressed by (x, y) with no bound, negative coordinates included.
+    Tile (x, y) lives in chunk (x // chunk_size, y // chunk_size).
+
+    **Attributes**
+        seed: *int*
+            Seed of the board, the same seed always gives the same mines
+        density: *float*
+            Fraction of the tiles holding a mine
+        chunk_size: *int*
+            Size of a chunk in tiles
+        max_chunks: *int*
+            Number of chunks kept in memory
+        chunks: *OrderedDict[tuple, Chunk]*
+            The chunks in memory, least recently used first
+        store: *ChunkStore*
+            Where evicted chunks are kept
+        safe_center: *tuple[int, int]*
+            The first tile uncovered, kept free of mines with its neighbors
+        flag_count: *int*
+            The number of flagged tiles
+        revealed_count: *int*
+            The number of tiles without a mine revealed, the score of the game
+        lost: *bool*
+            Whether a mine was uncovered
+    """
+
+    # An endless board has no mine count and cannot be won
+    num_mine = None
+    won = False
+
+    def __init__(self, seed=None, density=DEFAULT_DENSITY, chunk_size=CHUNK_SIZE,
+                 max_chunks=MAX_CHUNKS, store_path=None):
+        """
+        Initialization of the EndlessField.
+
+        **Parameters**
+            seed: *int*
+                Seed of the board, a random one if not given
+            density: *float*
+                Fraction of the tiles holding a mine
+            chunk_size: *int*
+                Size of a chunk in tiles
+            max_chunks: *int*
+                Number of chunks kept in memory, at least 9 so a chunk and its neighbors fit
+            store_path: *str*
+                Path of the on-disk store of evicted chunks, a temporary one if not given
+        """
+        if seed is None:
+            seed = int(np.random.SeedSequence().generate_state(1)[0])
+        self.seed = seed
+        self.density = density
+        self.chunk_size = chunk_size
+        self.max_chunks = max(9, max_chunks)
+        self.chunks = OrderedDict()
+        self._mines = OrderedDict()
+        self.store = ChunkStore(store_path)
+        self.safe_center = None
+        self.flag_count = 0
+        self.revealed_count = 0
+        self.lost = False
+
+    @property
+    def mines_left(self):
+        """
+        Mines left to flag, unknown on an endless board.
+        """
+        return None
+
+    def mark_dirty(self, cells):
+        """
+        Hook called with the tiles whose state changed.
+        The engine keeps nothing; boards that draw themselves override it.
+
+        **Parameters**
+            cells: *tuple[numpy.ndarray, numpy.ndarray]*
+                x and y coordinates of the tiles, None for every tile in memory
+        """
+
+    def chunk_mines(self, cx, cy):
+        """
+        Gives the mines of a chunk. They only depend on the seed, the chunk coordinates
+        and the safe zone, so they are made again whenever needed instead of stored.
+
+        **Parameters**
+            cx: *int*
+                x index of the chunk
+            cy: *int*
+                y index of the chunk
+
+        **Returns**
+            *numpy.ndarray[bool]*
+                The mines of the chunk
+        """
+        key = (cx, cy)
+        mines = self._mines.get(key)
+        if mines is not None:
+            self._mines.move_to_end(key)
+            return mines
+        # The seed sequence hashes the seed and the chunk coordinates together,
+        # coordinates are shifted to be non-negative as it requires
+        rng = np.random.default_rng([self.seed, cx + 2 ** 62, cy + 2 ** 62])
+        mines = rng.random((self.chunk_size, self.chunk_size)) < self.density
+        if self.safe_center is not None:
+            sx = self.safe_center[0] - cx * self.chunk_size
+            sy = self.safe_center[1] - cy * self.chunk_size
+            mines[max(0, sx - 1):max(0, sx + 2), max(0, sy - 1):max(0, sy + 2)] = False
+        self._mines[key] = mines
+        # mines are cheap to make again, a few neighbors per chunk in memory are enough
+        while len(self._mines) > 4 * self.max_chunks:
+            self._mines.popitem(last=False)
+        return mines
+
+    def chunk_numbers(self, cx, cy):
+        """
+        Computes the numbers of a chunk, looking at the mines of the 8 neighbor chunks
+        along its edges.
+
+        **Parameters**
+            cx: *int*
+                x index of the chunk
+            cy: *int*
+                y index of the chunk
+
+        **Returns**
+            *numpy.ndarray[uint8]*
+                The numbers of the chunk, 0 on mines
+        """
+        size = self.chunk_size
+        # The chunk with a one tile border taken from its neighbors
+        halo = np.zeros((size + 2, size + 2), dtype=np.uint8)
+        for dx in range(-1, 2):
+            for dy in range(-1, 2):
+                mines = self.chunk_mines(cx + dx, cy + dy)
+                # the part of the neighbor that falls inside the border
+                src_x = slice(0, size) if dx == 0 else (slice(size - 1, size) if dx < 0 else slice(0, 1))
+                src_y = slice(0, size) if dy == 0 else (slice(size - 1, size) if dy < 0 else slice(0, 1))
+                dst_x = slice(1, size + 1) if dx == 0 else (slice(0, 1) if dx < 0 else slice(size + 1, size + 2))
+                dst_y = slice(1, size + 1) if dy == 0 else (slice(0, 1) if dy < 0 else slice(size + 1, size + 2))
+                halo[dst_x, dst_y] = mines[src_x, src_y]
+        return box_sum(halo)
+
+    def chunk(self, cx, cy):
+        """
+        Gives a chunk, making it on first use or loading its state back from the store.
+        The least recently used chunks are evicted once there are too many.
+
+        **Parameters**
+            cx: *int*
+                x index of the chunk
+            cy: *int*
+                y index of the chunk
+
+        **Returns**
+            *Chunk*
+                The chunk
+        """
+        key = (cx, cy)
+        chunk = self.chunks.get(key)
+        if chunk is not None:
+            self.chunks.move_to_end(key)
+            return chunk
+        data = self.store.load(cx, cy)
+        state = None if data is None else Chunk.unpack_state(data, self.chunk_size)
+        chunk = self.chunks[key] = Chunk(self.chunk_mines(cx, cy), self.chunk_numbers(cx, cy), state)
+        while len(self.chunks) > self.max_chunks:
+            self.evict()
+        return chunk
+
+    def evict(self):
+        """
+        Removes the least recently used chunk from memory.
+        A chunk the player changed is written to the store first, an untouched one
+        is just dropped since it can be made again from the seed.
+        """
+        (cx, cy), chunk = self.chunks.popitem(last=False)
+        if chunk.touched:
+            self.store.save(cx, cy, chunk.pack())
+
+    def locate(self, x, y):
+        """
+        Finds the chunk of a tile and the position of the tile inside it.
+
+        **Parameters**
+            x: *int*
+                x coordinate of the tile
+            y: *int*
+                y coordinate of the tile
+
+        **Returns**
+            *tuple[Chunk, int, int]*
+                The chunk and the coordinates of the tile inside it
+        """
+        cx, lx = divmod(x, self.chunk_size)
+        cy, ly = divmod(y, self.chunk_size)
+        return self.chunk(cx, cy), lx, ly
+
+    def cell_state(self, xs, ys):
+        """
+        Gathers the state of many tiles at once, chunk by chunk, making the chunks
+        they fall in if needed.
+
+        **Parameters**
+            xs: *numpy.ndarray[int]*
+                x coordinates of the tiles
+            ys: *numpy.ndarray[int]*
+                y coordinates of the tiles
+
+        **Returns**
+            *dict[str, numpy.ndarray]*
+                The mine, adjacent, revealed, flagged, exploded and wrong_flag value of every tile
+        """
+        names = ("mine", "adjacent") + Chunk.STATE
+        state = {name: np.zeros(xs.shape, dtype=np.uint8 if name == "adjacent" else bool) for name in names}
+        cxs, lxs = np.divmod(xs, self.chunk_size)
+        cys, lys = np.divmod(ys, self.chunk_size)
+        keys = cxs * (2 ** 32) + (cys & 0xFFFFFFFF)
+        for key in np.unique(keys).tolist():
+            part = keys == key
+            chunk = self.chunk(int(cxs[part][0]), int(cys[part][0]))
+            for name in names:
+                state[name][part] = getattr(chunk, name)[lxs[part], lys[part]]
+        return state
+
+    def place_mines_post_first_click(self, first_click_x, first_click_y):
+        """
+        Keeps the first click and its neighbors free of mines.
+        Chunks made before, by the viewport, get their mines and numbers again.
+
+        **Parameters**
+            first_click_x: *int*
+                x coordinate of the first click
+            first_click_y: *int*
+                y coordinate of the first click
+        """
+        self.safe_center = (first_click_x, first_click_y)
+        self._mines.clear()
+        for (cx, cy), chunk in self.chunks.items():
+            chunk.mine = self.chunk_mines(cx, cy)
+            chunk.adjacent = self.chunk_numbers(cx, cy)
+        self.mark_dirty(None)
+
+    def boundary_check(self, x, y):
+        """
+        Every tile is inside an endless board.
+
+        **Returns**
+            *bool*
+                Always True
+        """
+        return True
+
+    def reveal(self, x, y):
+        """
+        Reveals a tile and, if it is a blank tile, the whole blank region around it.
+        The region is explored with a stack; a region crossing a chunk edge makes
+        the neighbor chunk on the fly. Flagged tiles are left untouched.
+
+        **Parameters**
+            x: *int*
+                x coordinate of the tile to reveal
+            y: *int*
+                y coordinate of the tile to reveal
+
+        **Returns**
+            *tuple[numpy.ndarray, numpy.ndarray]*
+                x and y coordinates of the tiles this call revealed
+        """
+        changed_x, changed_y = [], []
+        stack = [(x, y)]
+        while stack:
+            tx, ty = stack.pop()
+            chunk, lx, ly = self.locate(tx, ty)
+            if chunk.revealed[lx, ly] or chunk.flagged[lx, ly]:
+                continue
+            chunk.revealed[lx, ly] = True
+            changed_x.append(tx)
+            changed_y.append(ty)
+            # If we uncover and hit a mine, mine explodes
+            if chunk.mine[lx, ly]:
+                chunk.exploded[lx, ly] = True
+                self.lost = True
+                continue
+            self.revealed_count += 1
+            # Only blank tiles keep the cascade going, it stops at the numbers
+            if chunk.adjacent[lx, ly] == 0:
+                stack.extend((tx + dx, ty + dy) for dx in range(-1, 2) for dy in range(-1, 2) if dx or dy)
+        changed = (np.array(changed_x, dtype=np.int64), np.array(changed_y, dtype=np.int64))
+        if changed_x:
+            self.mark_dirty(changed)
+        return changed
+
+    def uncover(self, x, y):
+        """
+        Uncovers a tile and the blank region around it.
+
+        **Parameters**
+            x: *int*
+                x coordinate of the tile to uncover
+            y: *int*
+                y coordinate of the tile to uncover
+
+        **Returns**
+            *bool*
+                True if the uncover action is safe, False if a mine exploded
+        """
+        self.reveal(x, y)
+        chunk, lx, ly = self.locate(x, y)
+        return not chunk.exploded[lx, ly]
+
+    def toggle_flag(self, x, y):
+        """
+        Puts a flag on a tile that is not revealed, or removes it.
+
+        **Parameters**
+            x: *int*
+                x coordinate of the tile
+            y: *int*
+                y coordinate of the tile
+
+        **Returns**
+            *bool*
+                True if the flag changed, False if the tile is already revealed
+        """
+        chunk, lx, ly = self.locate(x, y)
+        if chunk.revealed[lx, ly]:
+            return False
+        chunk.flagged[lx, ly] = not chunk.flagged[lx, ly]
+        self.flag_count += 1 if chunk.flagged[lx, ly] else -1
+        self.mark_dirty((np.array([x]), np.array([y])))
+        return True
+
+    def explode_mines(self):
+        """
+        Reveals the mines and marks wrongly flagged tiles of the chunks in memory,
+        which include every chunk on screen.
+        """
+        for chunk in self.chunks.values():
+            chunk.revealed |= chunk.mine
+            wrong = chunk.flagged & ~chunk.mine
+            chunk.wrong_flag |= wrong
+            chunk.flagged &= ~wrong
+            chunk.revealed |= wrong
+            self.flag_count -= int(np.count_nonzero(wrong))
+        self.mark_dirty(None)
+
+    def show_board(self):
+        """
+        Prints the chunk of the first click to the console.
+        Useful for debugging.
+        """
+        x, y = self.safe_center or (0, 0)
+        chunk, _, _ = self.locate(x, y)
+        for mine_row, number_row in zip(chunk.mine, chunk.adjacent):
+            print("[" + ", ".join("M" if m else ("n" if n else ".") for m, n in zip(mine_row, number_row)) + "]")
+
+    def close(self):
+        """
+        Closes the store of evicted chunks.
+        """
+        self.store.close()
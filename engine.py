@@ -0,0 +1,619 @@
+"""
+This code is the game engine of Minesweeper.
+1. Board state kept in compact NumPy arrays
+2. Mine placement and clue numbers
+3. Reveal, flag, win and loss rules
+
+It has no pygame dependency and reads no settings, so boards can be created,
+played and tested headless, many of them in one process.
+"""
+
+import numpy as np
+
+# Offsets of the 8 neighbors around a tile
+NEIGHBOR_OFFSETS = [(dx, dy) for dx in range(-1, 2) for dy in range(-1, 2) if dx or dy]
+
+
+def box_sum(padded):
+    """
+    Counts the mines around every tile of a block, from the mines of the block with a
+    one tile border around it. The 3x3 box sum is done as a sum of shifted rows
+    followed by a sum of shifted columns.
+
+    **Parameters**
+        padded: *numpy.ndarray[uint8]*
+            1 on the mines of the block and of its border, 0 elsewhere, the border
+            left empty where it falls outside the board
+
+    **Returns**
+        box: *numpy.ndarray[uint8]*
+            The number of every tile of the block, 0 on the mines
+    """
+    # mines in the 1x3 strip around each tile
+    strip = padded[:, :-2] + padded[:, 1:-1] + padded[:, 2:]
+    # mines in the 3x3 box around each tile, minus the tile itself
+    box = strip[:-2] + strip[1:-1] + strip[2:]
+    mine = padded[1:-1, 1:-1].astype(bool)
+    box -= mine
+    # Mine tiles keep no number, they show the mine image
+    box[mine] = 0
+    return box
+
+
+class MineField:
+    """
+    This class holds the state of one Minesweeper board and applies the rules of the game.
+    The state of the tiles is kept in NumPy arrays indexed by [x, y]; a tile is also
+    addressed by its flat index x * cols + y.
+
+    **Attributes**
+        rows: *int*
+            Number of tiles along x
+        cols: *int*
+            Number of tiles along y
+        num_mine: *int*
+            Number of mines on the board
+        seed: *int*
+            Seed of the random mine placement, None for a random board
+        rng: *numpy.random.Generator*
+            Random generator used to place the mines
+        mine: *numpy.ndarray[bool]*
+            Whether a tile holds a mine
+        adjacent: *numpy.ndarray[uint8]*
+            The number of mines around each tile
+        revealed: *numpy.ndarray[bool]*
+            Whether a tile is revealed
+        flagged: *numpy.ndarray[bool]*
+            Whether a tile is flagged
+        exploded: *numpy.ndarray[bool]*
+            Whether a tile is the mine that exploded
+        wrong_flag: *numpy.ndarray[bool]*
+            Whether a tile was wrongly flagged, shown when the game is lost
+        flag_count: *int*
+            The number of flagged tiles
+        safe_remaining: *int*
+            The number of tiles without a mine that are not revealed yet
+        mines_placed: *bool*
+            Whether the mines have been placed on the board
+        candidate: *bool*
+            Whether mine and adjacent hold a candidate layout, prepared before the first
+            click and fixed up by place_mines_post_first_click
+        lost: *bool*
+            Whether a mine was uncovered
+        source: *object*
+            Where the rows not read yet come from, such as the save file of a resumed game,
+            None once the arrays hold the whole board
+    """
+
+    def __init__(self, rows, cols, num_mine, seed=None):
+        """
+        Initialization of the MineField. The board starts without mines,
+        they are placed by place_mines_post_first_click or lay_mines.
+
+        **Parameters**
+            rows: *int*
+                Number of tiles along x
+            cols: *int*
+                Number of tiles along y
+            num_mine: *int*
+                Number of mines on the board
+            seed: *int*
+                Seed of the random mine placement, for reproducible boards.
+                A fresh random board is made if not given.
+        """
+        self.rows = rows
+        self.cols = cols
+        self.num_mine = num_mine
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        shape = (rows, cols)
+        self.mine = np.zeros(shape, dtype=bool)
+        self.adjacent = np.zeros(shape, dtype=np.uint8)
+        self.revealed = np.zeros(shape, dtype=bool)
+        self.flagged = np.zeros(shape, dtype=bool)
+        self.exploded = np.zeros(shape, dtype=bool)
+        self.wrong_flag = np.zeros(shape, dtype=bool)
+        self.flag_count = 0
+        self.safe_remaining = rows * cols - num_mine
+        self.mines_placed = False
+        self.candidate = False
+        self.lost = False
+        self.source = None
+
+    @property
+    def mines_left(self):
+        """
+        Mines left to flag, the number shown by the mine counter.
+        """
+        return self.num_mine - self.flag_count
+
+    @property
+    def won(self):
+        """
+        Whether all the tiles without a mine are revealed, a constant time check.
+        """
+        return self.mines_placed and not self.lost and self.safe_remaining == 0
+
+    def mark_dirty(self, cells):
+        """
+        Hook called with the tiles whose state changed.
+        The engine keeps nothing; boards that draw themselves override it.
+
+        **Parameters**
+            cells: *numpy.ndarray*
+                Either flat indices of the tiles or a boolean mask of the board
+        """
+
+    def need_rows(self, x0, x1):
+        """
+        Makes sure rows x0 to x1 of the state arrays hold the state of the board.
+        A resumed board reads its rows from its source the first time they are needed,
+        every other board always holds all of them and this does nothing.
+
+        **Parameters**
+            x0: *int*
+                First row, clipped to the board
+            x1: *int*
+                Row after the last one, clipped to the board
+
+        **Returns**
+            *list[tuple[int, int]]*
+                First and end row of every band of rows read by this call
+        """
+        if self.source is None:
+            return []
+        return self.source.load_rows(self, max(x0, 0), min(x1, self.rows))
+
+    def sample_mines(self, count, excluded=()):
+        """
+        Picks the tiles for the mines, without replacement, among the tiles that are
+        not excluded. This runs in time linear in the number of mines and of excluded
+        tiles and never retries, whatever the density of the board.
+
+        **Parameters**
+            count: *int*
+                The number of mines to place
+            excluded: *numpy.ndarray[int]*
+                Flat indices of the tiles which must stay free of mines, sorted and unique
+
+        **Returns**
+            *numpy.ndarray[int]*
+                Flat indices of the mine tiles
+
+        **Raises**
+            ValueError
+                If there are not enough eligible tiles to hold all the mines
+        """
+        excluded = np.asarray(excluded, dtype=np.intp)
+        eligible = self.rows * self.cols - excluded.size
+        if not 0 <= count <= eligible:
+            raise ValueError(f"Cannot place {count} mines: only {eligible} of the "
+                             f"{self.rows}x{self.cols} tiles are eligible")
+        picks = self.rng.choice(eligible, size=count, replace=False, shuffle=False)
+        # Map the k-th eligible tile back to its board index by skipping over
+        # the excluded tiles that come before it
+        return picks + np.searchsorted(excluded - np.arange(excluded.size), picks, side="right")
+
+    def prepare_mines(self):
+        """
+        Prepares a candidate layout before the first click: num_mine mines anywhere
+        on the board and their numbers. This is the costly part of placing the mines,
+        so it can be done ahead of time, even in another thread, while the first click
+        only moves the few mines that fall in its safe zone.
+        The board is not playable until place_mines_post_first_click.
+        """
+        self.need_rows(0, self.rows)
+        self.mine[...] = False
+        self.mine.ravel()[self.sample_mines(self.num_mine)] = True
+        self.adjacent[...] = self.count_adjacent()
+        self.candidate = True
+
+    def lay_mines(self):
+        """
+        Randomly places num_mine mines anywhere on the board and puts the numbers.
+        This also ensures that each mine is placed on a unique tile.
+        """
+        if not self.candidate:
+            self.prepare_mines()
+        self.candidate = False
+        self.put_numbers()
+
+    def place_mines_post_first_click(self, first_click_x, first_click_y):
+        """
+        Places mines on the board after the first click.
+        This ensures that the first click we don't hit a mine.
+        The mines come from the candidate layout, prepared now if it was not before.
+        Candidate mines in the safe zone around the click are moved to random free
+        tiles outside of it, and only the numbers around the moved mines are counted again.
+        Moving mines this way keeps every layout without a mine in the safe zone
+        equally likely, and the result only depends on the seed and the click.
+
+        **Parameters**
+            first_click_x: *int*
+                x coordinate of the first click
+            first_click_y: *int*
+                y coordinate of the first click
+
+        **Raises**
+            ValueError
+                If num_mine does not fit in the tiles outside the safe zone
+        """
+        zone = self.safe_zone(first_click_x, first_click_y)
+        eligible = self.rows * self.cols - len(zone)
+        if not 0 <= self.num_mine <= eligible:
+            raise ValueError(f"Cannot place {self.num_mine} mines: only {eligible} of the "
+                             f"{self.rows}x{self.cols} tiles are eligible")
+        if not self.candidate:
+            self.prepare_mines()
+        self.candidate = False
+        moved = [(x, y) for x, y in zone if self.mine[x, y]]
+        blocked = self.mine.copy()
+        for x, y in zone:
+            blocked[x, y] = True
+        # the moved mines go to tiles drawn among those neither in the zone nor holding a mine
+        picks = self.sample_mines(len(moved), np.flatnonzero(blocked))
+        targets = [divmod(p, self.cols) for p in picks.tolist()]
+        for x, y in moved:
+            self.mine[x, y] = False
+        for x, y in targets:
+            self.mine[x, y] = True
+        for x, y in moved + targets:
+            self.recount(x, y)
+        self.mines_placed = True
+        self.mark_dirty(np.array([x * self.cols + y for x, y in moved + targets], dtype=np.intp))
+
+    def recount(self, x, y):
+        """
+        Counts again the numbers of a tile and its neighbors, after a mine was added or removed there.
+
+        **Parameters**
+            x: *int*
+                x coordinate of the tile
+            y: *int*
+                y coordinate of the tile
+        """
+        x0, x1 = max(x - 1, 0), min(x + 2, self.rows)
+        y0, y1 = max(y - 1, 0), min(y + 2, self.cols)
+        # the window of mines one tile around the window of numbers, left empty where it
+        # goes past the edges of the board
+        window = np.zeros((x1 - x0 + 2, y1 - y0 + 2), dtype=np.uint8)
+        xa, xb = max(x0 - 1, 0), min(x1 + 1, self.rows)
+        ya, yb = max(y0 - 1, 0), min(y1 + 1, self.cols)
+        window[xa - x0 + 1:xb - x0 + 1, ya - y0 + 1:yb - y0 + 1] = self.mine[xa:xb, ya:yb]
+        self.adjacent[x0:x1, y0:y1] = box_sum(window)
+
+    def set_mines(self, indices):
+        """
+        Places mines on given tiles and puts the numbers, for mine layouts made
+        elsewhere such as the no-guess generator. The board must have no mine yet.
+
+        **Parameters**
+            indices: *numpy.ndarray[int]*
+                Flat indices of the mine tiles
+
+        **Raises**
+            ValueError
+                If the number of tiles is not num_mine
+        """
+        indices = np.unique(indices)
+        if indices.size != self.num_mine:
+            raise ValueError(f"Expected {self.num_mine} mines, got {indices.size}")
+        self.need_rows(0, self.rows)
+        self.mine[...] = False
+        self.mine.ravel()[indices] = True
+        self.candidate = False
+        self.put_numbers()
+
+    def safe_zone(self, x, y):
+        """
+        Gives the tiles kept free of mines around the first click.
+
+        **Parameters**
+            x: *int*
+                x coordinate of the first click
+            y: *int*
+                y coordinate of the first click
+
+        **Returns**
+            *list[tuple]*
+                Coordinates of the tile and its neighbors inside the board
+        """
+        return [(sx, sy) for sx in range(x - 1, x + 2) for sy in range(y - 1, y + 2)
+                if self.boundary_check(sx, sy)]
+
+    def put_numbers(self):
+        """
+        Assigns numbers to tiles based on the number of adjacent mines.
+        This method is called after mines have been placed on the board.
+        """
+        self.need_rows(0, self.rows)
+        self.adjacent[...] = self.count_adjacent()
+        self.mines_placed = True
+        self.mark_dirty(np.ones(self.mine.shape, dtype=bool))
+
+    def count_adjacent(self):
+        """
+        Counts the mines around every tile.
+        All the numbers are computed at once from the mine mask, see box_sum.
+
+        **Returns**
+            *numpy.ndarray[uint8]*
+                The number of every tile, 0 on the mines
+        """
+        return box_sum(np.pad(self.mine.astype(np.uint8), 1))
+
+    def boundary_check(self, x, y):
+        """
+        This is to check if we're inside the boards' boundary.
+
+        **Parameters**
+            x: *int*
+                The x coordinate to check
+            y: *int*
+                The y coordinate to check
+
+        **Returns**
+            check: *bool*
+                True if within the boundary, False otherwise
+        """
+        check = 0 <= x < self.rows and 0 <= y < self.cols
+        return check
+
+    def check_neighbors(self, x, y):
+        """
+        Counts the number of neighboring mines adjacent to our tile of interest.
+
+        **Parameters**
+            x: *int*
+                x coordinate of the tile
+            y: *int*
+                y coordinate of the tile
+
+        **Returns**
+            mine_count: *int*
+                The number of neighboring mines
+        """
+        self.need_rows(x - 1, x + 2)
+        mine_count = 0
+        # coordinates of the neighbors around our tile of interest
+        # starting from top left of it which is (-1,-1)
+        for x1 in range(-1, 2):
+            for y1 in range(-1, 2):
+                nb_x = x + x1
+                nb_y = y + y1
+                # check if neighbor is within boundary
+                if self.boundary_check(nb_x, nb_y):
+                    # check if neighbor is a mine
+                    if self.mine[nb_x, nb_y]:
+                        mine_count += 1
+        return mine_count
+
+    def tile_type(self, x, y):
+        """
+        Gives the type of a tile:
+            "." = blank tile
+            "M" = mine
+            "n" = numbers shown on board as clues
+
+        **Parameters**
+            x: *int*
+                x coordinate of the tile
+            y: *int*
+                y coordinate of the tile
+
+        **Returns**
+            *str*
+                The type of the tile
+        """
+        self.need_rows(x, x + 1)
+        if self.mine[x, y]:
+            return "M"
+        if self.adjacent[x, y] > 0:
+            return "n"
+        return "."
+
+    def reveal(self, x, y):
+        """
+        Reveals a tile and, if it is a blank tile, the whole blank region around it.
+        The region is explored breadth first, one ring of cells at a time. Only the
+        tiles the region reaches are looked at, the revealed tiles of the board doing
+        the visited tracking. Flagged tiles are left untouched.
+        On a resumed board the cascade reads in the rows it reaches as it goes.
+
+        **Parameters**
+            x: *int*
+                x coordinate of the tile to reveal
+            y: *int*
+                y coordinate of the tile to reveal
+
+        **Returns**
+            changed: *numpy.ndarray[int]*
+                Flat indices of the tiles this call revealed
+        """
+        self.need_rows(x, x + 1)
+        if self.revealed[x, y] or self.flagged[x, y]:
+            return np.empty(0, dtype=np.intp)
+        self.revealed[x, y] = True
+        # If we uncover and hit a mine, mine explodes
+        if self.mine[x, y]:
+            self.exploded[x, y] = True
+            self.lost = True
+        rows, cols = self.rows, self.cols
+        if self.mine[x, y] or self.adjacent[x, y] > 0:
+            changed = np.array([x * cols + y], dtype=np.intp)
+            self.safe_remaining -= not self.mine[x, y]
+            self.mark_dirty(changed)
+            return changed
+        # The cascade only looks at the tiles it reaches, checked against the board itself:
+        # revealed tiles are the visited ones, so the cost follows the size of the region
+        revealed, flagged = self.revealed.ravel(), self.flagged.ravel()
+        adjacent, mine = self.adjacent.ravel(), self.mine.ravel()
+        offsets = np.array([dx * cols + dy for dx, dy in NEIGHBOR_OFFSETS], dtype=np.intp)
+        # offsets to the left or the right wrap around to another row from the first or last column
+        left = np.array([dy < 0 for _, dy in NEIGHBOR_OFFSETS])
+        right = np.array([dy > 0 for _, dy in NEIGHBOR_OFFSETS])
+        size = revealed.size
+        frontier = np.array([x * cols + y], dtype=np.intp)
+        changed = [frontier]
+        while frontier.size:
+            # Only blank tiles keep the cascade going, it stops at the numbers
+            frontier = frontier[(adjacent[frontier] == 0) & ~mine[frontier]]
+            if not frontier.size:
+                break
+            # rows the ring reaches are read in before their tiles are looked at,
+            # the frontier is sorted so its ends give the first and last rows
+            self.need_rows(int(frontier[0]) // cols - 1, int(frontier[-1]) // cols + 2)
+            ys = frontier % cols
+            edge = (frontier < cols) | (frontier >= size - cols) | (ys == 0) | (ys == cols - 1)
+            ring = (frontier[~edge, None] + offsets).ravel()
+            if edge.any():
+                # only the tiles on the edge of the board have neighbors off it
+                ys = ys[edge, None]
+                outer = frontier[edge, None] + offsets
+                outer = outer[(outer >= 0) & (outer < size) & ~(left & (ys == 0)) & ~(right & (ys == cols - 1))]
+                ring = np.concatenate((ring, outer))
+            ring = ring[~(revealed[ring] | flagged[ring])]
+            # the same tile can be the neighbor of several frontier tiles
+            ring.sort()
+            first = np.ones(ring.size, dtype=bool)
+            np.not_equal(ring[1:], ring[:-1], out=first[1:])
+            frontier = ring[first]
+            revealed[frontier] = True
+            changed.append(frontier)
+        changed = np.concatenate(changed)
+        # A cascade only goes through tiles without a mine
+        self.safe_remaining -= changed.size
+        self.mark_dirty(changed)
+        return changed
+
+    def uncover(self, x, y):
+        """
+        Uncovers a tile at the specific coordinates and performs actions based on the type pf tile.
+        If the tile is a mine, explodes.
+        If the tile is a number, reveals itself.
+        If the tile is a blank tile, it triggers the uncovering of the blank region around it.
+
+        **Parameters**
+            x: *int*
+                x coordinate of the tile to uncover
+            y: *int*
+                y coordinate of the tile to uncover
+
+        **Returns**
+            *bool*
+                True if the uncover action is successful and safe
+                False if a mine is uncovered
+        """
+        self.reveal(x, y)
+        # a flagged tile is left alone, even with a mine under it
+        return not self.exploded[x, y]
+
+    def play_move(self, x, y, flag=False):
+        """
+        Plays one move of a player, the way the game does: a flag toggles the flag of the
+        tile, a reveal places the mines around the first one and uncovers the tile.
+        Showing the mines once the game is lost is left to the caller, see explode_mines.
+
+        **Parameters**
+            x: *int*
+                x coordinate of the tile
+            y: *int*
+                y coordinate of the tile
+            flag: *bool*
+                Whether the move toggles a flag instead of revealing the tile
+
+        **Returns**
+            *bool*
+                False if the move uncovered a mine, True otherwise
+        """
+        if flag:
+            self.toggle_flag(x, y)
+            return True
+        if not self.mines_placed:
+            self.place_mines_post_first_click(x, y)
+        return self.uncover(x, y)
+
+    def set_revealed(self, x, y, value):
+        """
+        Sets whether a single tile is revealed, without any cascade.
+
+        **Parameters**
+            x: *int*
+                x coordinate of the tile
+            y: *int*
+                y coordinate of the tile
+            value: *bool*
+                Whether the tile is revealed
+        """
+        self.need_rows(x, x + 1)
+        value = bool(value)
+        if value == self.revealed[x, y]:
+            return
+        if not self.mine[x, y]:
+            self.safe_remaining -= 1 if value else -1
+        self.revealed[x, y] = value
+        self.mark_dirty(x * self.cols + y)
+
+    def set_flag(self, x, y, value):
+        """
+        Sets whether a single tile is flagged.
+
+        **Parameters**
+            x: *int*
+                x coordinate of the tile
+            y: *int*
+                y coordinate of the tile
+            value: *bool*
+                Whether the tile is flagged
+        """
+        self.need_rows(x, x + 1)
+        value = bool(value)
+        if value == self.flagged[x, y]:
+            return
+        self.flag_count += 1 if value else -1
+        self.flagged[x, y] = value
+        self.mark_dirty(x * self.cols + y)
+
+    def toggle_flag(self, x, y):
+        """
+        Puts a flag on a tile that is not revealed, or removes it.
+
+        **Parameters**
+            x: *int*
+                x coordinate of the tile
+            y: *int*
+                y coordinate of the tile
+
+        **Returns**
+            *bool*
+                True if the flag changed, False if the tile is already revealed
+        """
+        self.need_rows(x, x + 1)
+        if self.revealed[x, y]:
+            return False
+        self.set_flag(x, y, not self.flagged[x, y])
+        return True
+
+    def explode_mines(self):
+        """
+        Reveals all mines and marks wrongly flagged tiles.
+        This is the final state of the board when the game is lost.
+        """
+        self.need_rows(0, self.rows)
+        self.revealed |= self.mine  # Reveal all mines
+        # Wrongly flagged tiles are revealed showing the "not a mine" image
+        wrong = self.flagged & ~self.mine
+        self.wrong_flag |= wrong
+        self.flagged &= ~wrong
+        self.flag_count -= int(np.count_nonzero(wrong))
+        self.safe_remaining -= int(np.count_nonzero(wrong & ~self.revealed))
+        self.revealed |= wrong
+        self.mark_dirty(self.mine | wrong)
+
+    def show_board(self):
+        """
+        Prints the current state of the board to the console.
+        Useful for debugging.
+        """
+        for x in range(self.rows):
+            print("[" + ", ".join(self.tile_type(x, y) for y in range(self.cols)) + "]")
@@ -0,0 +1,195 @@
+"""
+This code makes boards that can be solved without guessing.
+1. Boards are generated and played by the solver from a start tile, until one is won by logic alone
+2. A pool of worker processes keeps a few boards ready for each board size and mine count
+3. The game takes a ready board from the pool, so a new game starts at once
+"""
+
+import weakref
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from engine import MineField
+from solver import Solver
+
+
+class Layout:
+    """
+    This class is a board made by the generator: where the mines are and where to start.
+
+    **Attributes**
+        rows: *int*
+            Number of tiles along x
+        cols: *int*
+            Number of tiles along y
+        seed: *list[int]*
+            Seed of the MineField of the attempt that made the board
+        start: *tuple[int, int]*
+            The tile to uncover first, a blank tile from which the board is solved by logic
+        mines: *numpy.ndarray[int]*
+            Flat indices of the mine tiles
+        attempts: *int*
+            Number of boards generated to find this one
+    """
+
+    def __init__(self, rows, cols, seed, start, mines, attempts):
+        """
+        Layout initialization.
+
+        **Parameters**
+            rows: *int*
+                Number of tiles along x
+            cols: *int*
+                Number of tiles along y
+            seed: *list[int]*
+                Seed of the attempt that made the board
+            start: *tuple[int, int]*
+                The tile to uncover first
+            mines: *numpy.ndarray[int]*
+                Flat indices of the mine tiles
+            attempts: *int*
+                Number of boards generated to find this one
+        """
+        self.rows = rows
+        self.cols = cols
+        self.seed = seed
+        self.start = start
+        self.mines = mines
+        self.attempts = attempts
+
+    def __repr__(self):
+        return f"Layout({self.rows}x{self.cols}, {self.mines.size} mines, start={self.start}, seed={self.seed})"
+
+
+def generate_no_guess(rows, cols, mines, seed=None, max_attempts=10000):
+    """
+    Generates boards until one can be solved by logic alone from its start tile.
+    Each attempt picks a random start tile, places the mines around it as for a first
+    click, and lets the Solver play.
+
+    **Parameters**
+        rows: *int*
+            Number of tiles along x
+        cols: *int*
+            Number of tiles along y
+        mines: *int*
+            Number of mines
+        seed: *int or list[int]*
+            Seed of the generator, the same seed always gives the same board.
+            A random board is made if not given.
+        max_attempts: *int*
+            Number of boards tried before giving up
+
+    **Returns**
+        *Layout*
+            The board
+
+    **Raises**
+        ValueError
+            If no board is found in max_attempts attempts, the mines are likely too dense
+    """
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    base = list(seed) if isinstance(seed, (list, tuple)) else [seed]
+    for attempt in range(max_attempts):
+        field = MineField(rows, cols, mines, base + [attempt])
+        start = int(field.rng.integers(rows)), int(field.rng.integers(cols))
+        field.place_mines_post_first_click(*start)
+        field.reveal(*start)
+        if Solver(field, trust_flags=False).solve():
+            return Layout(rows, cols, base + [attempt], start, np.flatnonzero(field.mine), attempt + 1)
+    raise ValueError(f"No {rows}x{cols} board with {mines} mines solvable without guessing "
+                     f"was found in {max_attempts} attempts")
+
+
+class BoardPool:
+    """
+    This class keeps no-guess boards ready for each (rows, cols, mines) configuration,
+    generated ahead of time in worker processes.
+
+    **Attributes**
+        depth: *int*
+            Number of boards kept ready or in progress for each configuration
+        seed: *list[int]*
+            Seed of the pool, the n-th board of a configuration uses seed + [rows, cols, mines, n]
+        pending: *dict[tuple[int, int, int], collections.deque]*
+            The futures of the boards of every configuration, oldest first
+        made: *dict[tuple[int, int, int], int]*
+            Number of boards started for every configuration
+    """
+
+    def __init__(self, depth=4, workers=None, seed=None):
+        """
+        BoardPool initialization. No worker starts until a configuration is asked for.
+
+        **Parameters**
+            depth: *int*
+                Number of boards kept ready or in progress for each configuration
+            workers: *int*
+                Number of worker processes, default to the number of CPUs
+            seed: *int*
+                Seed of the pool, for reproducible boards. Random boards are made if not given.
+        """
+        self.depth = depth
+        self.workers = workers
+        self.seed = [np.random.SeedSequence().entropy if seed is None else seed]
+        self.pending = {}
+        self.made = {}
+        self.executor = None
+        self._cleanup = None
+
+    def fill(self, rows, cols, mines):
+        """
+        Starts generating boards of a configuration until depth of them are ready or in progress.
+
+        **Parameters**
+            rows: *int*
+                Number of tiles along x
+            cols: *int*
+                Number of tiles along y
+            mines: *int*
+                Number of mines
+        """
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            # Queued boards are dropped when the pool is, rather than generated for nothing
+            self._cleanup = weakref.finalize(self, self.executor.shutdown, wait=False, cancel_futures=True)
+        config = (rows, cols, mines)
+        pending = self.pending.setdefault(config, deque())
+        while len(pending) < self.depth:
+            n = self.made.get(config, 0)
+            self.made[config] = n + 1
+            pending.append(self.executor.submit(generate_no_guess, rows, cols, mines, self.seed + [rows, cols, mines, n]))
+
+    def get(self, rows, cols, mines):
+        """
+        Takes a board of a configuration, at once if one is ready, and starts generating its replacement.
+        Boards come out in the order they were started, so a seeded pool always gives the same boards.
+
+        **Parameters**
+            rows: *int*
+                Number of tiles along x
+            cols: *int*
+                Number of tiles along y
+            mines: *int*
+                Number of mines
+
+        **Returns**
+            *Layout*
+                The board
+        """
+        self.fill(rows, cols, mines)
+        layout = self.pending[rows, cols, mines].popleft().result()
+        self.fill(rows, cols, mines)
+        return layout
+
+    def close(self):
+        """
+        Stops the workers and drops the boards not taken.
+        """
+        if self._cleanup is not None:
+            self._cleanup()
+        self.executor = None
+        self.pending.clear()
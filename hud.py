@@ -0,0 +1,260 @@
+"""
+This code is for the heads-up display (HUD) drawn over the game board.
+1. Glyph cache: every character is rendered once and reused
+2. HUD fields: timer, mine counter, FPS readout and frame time overlay
+"""
+
+import pygame
+
+
+class GlyphCache:
+    """
+    This class renders the characters of one font and color once and keeps them,
+    so drawing a number is a few blits of cached surfaces.
+
+    **Attributes**
+        font: *pygame.font.Font*
+            The font the glyphs are rendered with
+        color: *tuple*
+            The color of the glyphs
+        glyphs: *dict[str, pygame.Surface]*
+            The rendered glyph of every character used so far
+    """
+
+    def __init__(self, font, color, preload="0123456789-"):
+        """
+        GlyphCache initialization.
+
+        **Parameters**
+            font: *pygame.font.Font*
+                The font the glyphs are rendered with
+            color: *tuple*
+                The color of the glyphs
+            preload: *str*
+                Characters rendered right away, the digits by default
+        """
+        self.font = font
+        self.color = color
+        self.glyphs = {}
+        for char in preload:
+            self.glyph(char)
+
+    def glyph(self, char):
+        """
+        Gives the rendered surface of a character, rendering it on first use.
+
+        **Parameters**
+            char: *str*
+                The character to render
+
+        **Returns**
+            *pygame.Surface*
+                The rendered character
+        """
+        surface = self.glyphs.get(char)
+        if surface is None:
+            surface = self.glyphs[char] = self.font.render(char, True, self.color)
+        return surface
+
+    def size(self, text):
+        """
+        Computes the size of a text drawn with the cached glyphs.
+
+        **Parameters**
+            text: *str*
+                The text to measure
+
+        **Returns**
+            *tuple[int, int]*
+                Width and height of the text in pixels
+        """
+        glyphs = [self.glyph(char) for char in text]
+        return sum(g.get_width() for g in glyphs), max(g.get_height() for g in glyphs)
+
+
+class HudField:
+    """
+    This class is one value shown on the HUD, such as the timer.
+    It only draws again when its value changes or when the board was drawn over it.
+
+    **Attributes**
+        glyphs: *GlyphCache*
+            The glyphs used to draw the value
+        pos: *tuple[int, int]*
+            The position of the field on the screen
+        align: *str*
+            "left" if pos is the top left corner of the text, "right" if it is the top right
+        prefix: *str*
+            Text drawn before the value
+        visible: *bool*
+            Whether the field is drawn at all
+        value: *int*
+            The value currently shown, None before the first draw
+        rect: *pygame.Rect*
+            The region of the screen covered by the field
+        stale: *bool*
+            Whether the field has to be drawn again
+    """
+
+    def __init__(self, glyphs, pos, align="left", prefix="", visible=True):
+        """
+        HudField initialization.
+
+        **Parameters**
+            glyphs: *GlyphCache*
+                The glyphs used to draw the value
+            pos: *tuple[int, int]*
+                The position of the field on the screen
+            align: *str*
+                "left" or "right", the side of the text pos stands for
+            prefix: *str*
+                Text drawn before the value
+            visible: *bool*
+                Whether the field is drawn at all, default to True
+        """
+        self.glyphs = glyphs
+        self.pos = pos
+        self.align = align
+        self.prefix = prefix
+        self.visible = visible
+        self.value = None
+        self.rect = pygame.Rect(pos, (0, 0))
+        self.stale = True
+
+    def set(self, value):
+        """
+        Sets the value shown by the field.
+        Nothing is rendered here, the field is only marked stale if the value changed.
+
+        **Parameters**
+            value: *int*
+                The new value
+        """
+        if value != self.value:
+            self.value = value
+            self.stale = True
+
+    def draw(self, screen, background):
+        """
+        Draws the field if it is stale.
+        The background is put back under the old text before the new text is drawn.
+
+        **Parameters**
+            screen: *pygame.Surface*
+                The surface to draw on
+            background: *pygame.Surface*
+                The surface holding what is under the HUD, in screen coordinates
+
+        **Returns**
+            *pygame.Rect*
+                The region of the screen that changed, None if the field was not drawn
+        """
+        if not self.stale or self.value is None:
+            return None
+        self.stale = False
+        old_rect = self.rect
+        screen.blit(background, old_rect, old_rect)
+        if not self.visible:
+            self.rect = pygame.Rect(self.pos, (0, 0))
+            return old_rect
+        text = self.prefix + str(self.value)
+        width, height = self.glyphs.size(text)
+        x, y = self.pos
+        if self.align == "right":
+            x -= width
+        self.rect = pygame.Rect(x, y, width, height)
+        for char in text:
+            x += screen.blit(self.glyphs.glyph(char), (x, y)).width
+        return old_rect.union(self.rect)
+
+
+class Hud:
+    """
+    This class holds the fields of the HUD drawn over the board:
+    the timer in the top left corner, the number of mines left in the top right
+    corner, an FPS readout under the timer and the frame time percentiles under it,
+    both hidden by default.
+
+    **Attributes**
+        glyphs: *GlyphCache*
+            The glyphs shared by all the fields
+        timer: *HudField*
+            Seconds since the start of the game
+        mines: *HudField*
+            Number of mines minus the number of flags
+        fps: *HudField*
+            Frames per second
+        perf: *HudField*
+            Frame time percentiles, from the profiler
+        fields: *list[HudField]*
+            All the fields above
+    """
+
+    def __init__(self, width, color, font_size=36, show_fps=False):
+        """
+        Hud initialization. Loads the font and renders the digits once.
+
+        **Parameters**
+            width: *int*
+                Width of the screen, used to place the right aligned fields
+            color: *tuple*
+                Color of the text
+            font_size: *int*
+                Size of the font, default to 36
+            show_fps: *bool*
+                Whether the FPS readout is visible, default to False
+        """
+        self.glyphs = GlyphCache(pygame.font.Font(None, font_size), color, "0123456789- FPS")
+        self.timer = HudField(self.glyphs, (10, 10))
+        self.mines = HudField(self.glyphs, (width - 10, 10), align="right")
+        self.fps = HudField(self.glyphs, (10, 10 + font_size), prefix="FPS ", visible=show_fps)
+        self.perf = HudField(GlyphCache(pygame.font.Font(None, font_size * 2 // 3), color, "0123456789.p ms"),
+                             (10, 10 + 2 * font_size), visible=False)
+        self.fields = [self.timer, self.mines, self.fps, self.perf]
+
+    def invalidate(self, rects=None):
+        """
+        Marks the fields that were drawn over so that they are drawn again.
+
+        **Parameters**
+            rects: *list[pygame.Rect]*
+                Regions of the screen that were drawn over, all fields if None
+        """
+        for field in self.fields:
+            if rects is None or field.rect.collidelist(rects) != -1:
+                field.stale = True
+
+    def toggle_fps(self):
+        """
+        Shows or hides the FPS readout.
+        """
+        self.fps.visible = not self.fps.visible
+        self.fps.stale = True
+
+    def toggle_perf(self):
+        """
+        Shows or hides the frame time overlay.
+        """
+        self.perf.visible = not self.perf.visible
+        self.perf.stale = True
+
+    def draw(self, screen, background):
+        """
+        Draws the fields that changed.
+
+        **Parameters**
+            screen: *pygame.Surface*
+                The surface to draw on
+            background: *pygame.Surface*
+                The surface holding what is under the HUD, in screen coordinates
+
+        **Returns**
+            rects: *list[pygame.Rect]*
+                The regions of the screen that changed
+        """
+        rects = []
+        for field in self.fields:
+            rect = field.draw(screen, background)
+            if rect is not None:
+                rects.append(rect)
+        return rects
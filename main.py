@@ -9,15 +9,50 @@ Xiaojun Chen (Sylvia)
 
 Please refer to the README file for more info.
 """
+import argparse
+import atexit
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter_ns
+
+import numpy as np
 import pygame
-import random
 from settings import *
 import settings
+import assets
+from assets import (EXPLODED_BIT, FLAGGED_BIT, MINE_BIT, NUMBER_SHIFT, REVEALED_BIT, STATE_TILES,
+                    WRONG_FLAG_BIT, state_code)
+from camera import Camera
+from endless import EndlessField
+from engine import MineField
+from generator import BoardPool
+from hud import Hud
+from profiler import LatencyTracker, Profiler
+from replay import FLAG, REVEAL, Recorder, Replay
+from savegame import SaveFile
+
+# Above this many changed tiles a frame pushes one bounding rect instead of one rect per tile
+DIRTY_RECT_LIMIT = 64
+# The only events the game reads, every other event is dropped before it reaches the queue
+HANDLED_EVENTS = [pygame.QUIT, pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN, pygame.MOUSEMOTION, pygame.MOUSEWHEEL,
+                  pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE]
+# Methods timed by the profiler: the phases of the game loop, then the board operations
+GAME_SPANS = ["handle_events", "update_screen", "render_timer", "wait_events", "left_click_action",
+              "right_click_action", "save_game"]
+BOARD_SPANS = ["place_mines_post_first_click", "put_numbers", "uncover", "reveal", "toggle_flag", "explode_mines",
+               "make_board"]
+# Keys that scroll the board, with the direction they scroll in
+PAN_KEYS = {pygame.K_LEFT: (-1, 0), pygame.K_RIGHT: (1, 0), pygame.K_UP: (0, -1), pygame.K_DOWN: (0, 1),
+            pygame.K_a: (-1, 0), pygame.K_d: (1, 0), pygame.K_w: (0, -1), pygame.K_s: (0, 1)}
 
 ################Xiaojun Chen########################################################
 class Tile:
     """
-    This class is a wrapper for defining tiles in this game.
+    This class is a lightweight view of a single tile in this game.
+    The state of every tile is kept in the arrays of the GameBoard, a Tile is only
+    produced on demand and reads/writes its state straight through to those arrays.
+    It only holds its board and its flat index, in slots: the pixel position comes
+    from the index and the image from the state code through the shared STATE_TILES table.
     Tile type list:
         "." = unknown/un-clicked block
         "M" = mine
@@ -25,49 +60,108 @@ class Tile:
         "/" = blank/empty spot (not used)
     """
 
-    def __init__(self, x, y, img, tile_type, reveal=False, flag=False):
+    __slots__ = ("board", "index")
+
+    def __init__(self, board, grid_x, grid_y):
         """
         Tile initialization.
 
         **Parameters**
-            x: *int*
-                x coordinate of the tile
-            y: *int*
-                y coordinate of the tile
-            img: *pygame.Surface*
-                The tile image
-            title_type: *str*
-                Type of the tile
-            reveal: *bool*
-                Whether the tile is revealed, default to False
-            flag: *bool*
-                Whether the tile is flagged, default to False
-        """
-        self.x = x * tile_size
-        self.y = y * tile_size
-        self.img = img
-        self.tile_type = tile_type
-        self.reveal = reveal
-        self.flag = flag
+            board: *GameBoard*
+                The board holding the state of this tile
+            grid_x: *int*
+                x index of the tile on the board
+            grid_y: *int*
+                y index of the tile on the board
+        """
+        board.need_rows(grid_x, grid_x + 1)
+        self.board = board
+        self.index = grid_x * board.cols + grid_y
+
+    @property
+    def grid_x(self):
+        """
+        x index of the tile on the board
+        """
+        return self.index // self.board.cols
+
+    @property
+    def grid_y(self):
+        """
+        y index of the tile on the board
+        """
+        return self.index % self.board.cols
+
+    @property
+    def x(self):
+        """
+        x pixel coordinate of the tile
+        """
+        return self.grid_x * tile_size
+
+    @property
+    def y(self):
+        """
+        y pixel coordinate of the tile
+        """
+        return self.grid_y * tile_size
+
+    @property
+    def tile_type(self):
+        """
+        Type of the tile, see the tile type list above
+        """
+        return self.board.tile_type(self.grid_x, self.grid_y)
+
+    @property
+    def code(self):
+        """
+        State code of the tile, see state_code
+        """
+        board, i = self.board, self.index
+        return (int(board.adjacent.flat[i]) << NUMBER_SHIFT | MINE_BIT * bool(board.mine.flat[i])
+                | REVEALED_BIT * bool(board.revealed.flat[i]) | FLAGGED_BIT * bool(board.flagged.flat[i])
+                | EXPLODED_BIT * bool(board.exploded.flat[i]) | WRONG_FLAG_BIT * bool(board.wrong_flag.flat[i]))
+
+    @property
+    def img(self):
+        """
+        The tile image, looked up from the tile state
+        """
+        return assets.manager.tiles(tile_size)[assets.TILE_NAMES[STATE_TILES[self.code]]]
+
+    @property
+    def reveal(self):
+        """
+        Whether the tile is revealed
+        """
+        return bool(self.board.revealed.flat[self.index])
+
+    @reveal.setter
+    def reveal(self, value):
+        self.board.set_revealed(self.grid_x, self.grid_y, value)
+
+    @property
+    def flag(self):
+        """
+        Whether the tile is flagged
+        """
+        return bool(self.board.flagged.flat[self.index])
+
+    @flag.setter
+    def flag(self, value):
+        self.board.set_flag(self.grid_x, self.grid_y, value)
 
     def make_board(self, board_surface):
         """
-        Draws tiles on the given board surface.
+        Draws the tile on the given board surface: a number or a mine once revealed,
+        a flag, or the unknown tile.
 
         **Parameters**
             board_surface: *pygame.Surface*
                 The surface of board on which to draw the tiles.
         """
-        # We put either a mine or number on a revealed (clicked) tile
-        # We also make sure that this tile has no flag
-        if not self.flag and self.reveal:
-            board_surface.blit(self.img, (self.x, self.y))
-        # We put a flag on unknown (revealed) tile if right-clicked
-        elif self.flag and not self.reveal:
-            board_surface.blit(tile_flag, (self.x, self.y))
-        # Placing unknown tile
-        elif not self.reveal:
-            board_surface.blit(tile_unknown, (self.x, self.y))
+        board_surface.blit(self.img, (self.x, self.y))
 
     def __repr__(self):
         """
@@ -80,113 +174,275 @@ class Tile:
         return self.tile_type
 
 
-class GameBoard:
+class TileGrid:
     """
-    This class is a wrapper for the Minesweeper game board.
-    This class manages the tiles on the board, including their initial setup,
-    placement of mines, and revealing tiles during gameplay.
+    This class gives the GameBoard arrays the old ``board_element[x][y]`` interface.
+    Indexing a column creates the Tile views for that column on demand.
+    """
+
+    def __init__(self, board):
+        """
+        TileGrid initialization.
+
+        **Parameters**
+            board: *GameBoard*
+                The board the tiles are viewed from
+        """
+        self.board = board
+
+    def __len__(self):
+        return self.board.rows
+
+    def __getitem__(self, x):
+        """
+        Builds the Tile views of one column of the board.
+
+        **Parameters**
+            x: *int*
+                x index of the column
+
+        **Returns**
+            *list[Tile]*
+                The tiles of that column
+        """
+        if not 0 <= x < len(self):
+            raise IndexError(x)
+        return [Tile(self.board, x, y) for y in range(self.board.cols)]
+
+
+class BoardRenderer:
+    """
+    This class draws a board through a camera. It is mixed into the boards, which give
+    the state of any set of tiles through cell_state and report changed tiles through mark_dirty.
 
     **Attributes**
         board_surface:*pygame.Surface*
-            The surface on which the board elements/tiles are drawn
-        board_element: *list[list[Tile]]*
-            A 2D array of tile objects representing the game board
+            The surface on which the visible tiles are drawn, the size of the screen
+        pending: *list[tuple]*
+            x and y coordinates of the tiles changed since they were last drawn
+        view_stale: *bool*
+            Whether all the visible tiles have to be drawn again
+        drawn_view: *tuple*
+            The camera state the board surface was drawn for
         lay_mine: *bool*
             Indication of whether mines have been laid on the board
-        uncover_history: *list[tuple]*
-            A list to keep track of uncovered tiles to prevent redundant operations
     """
 
     def __init__(self):
         """
-        Initialization of the GameBoard
+        BoardRenderer initialization, every visible tile has to be drawn once.
         """
-        self.board_surface = pygame.Surface((default_width, default_height))
-        self.board_element = [[Tile(c, r, tile_blank, ".")
-                               for r in range(default_row)] for c in range(default_col)]
+        self.pending = []
+        self.view_stale = True
+        self.board_surface = None
+        self.drawn_view = None
         self.lay_mine = True
-        # self.lay_mine()
-        # self.put_numbers()
-        self.uncover_history = []
 
-    def lay_mine(self):
+    def mark_dirty(self, cells):
         """
-        Randomly places a predetermined number of mines on the board.
-        This also ensures that each mine is placed on a unique tile.
+        Marks tiles whose look changed so that the next make_board redraws them.
+        Changes given as a mask of the whole board, or as None, redraw every visible tile.
+
+        **Parameters**
+            cells: *tuple[numpy.ndarray, numpy.ndarray]*
+                x and y coordinates of the tiles
         """
-        for _ in range(num_mine):
-            while True:
-                # Generate a random location for laying mines
-                x_val = random.randint(0, default_row - 1)
-                y_val = random.randint(0, default_col - 1)
-                # Change the existing blank tile to mine tile
-                if self.board_element[x_val][y_val].tile_type == ".":
-                    self.board_element[x_val][y_val].img = tile_mine
-                    self.board_element[x_val][y_val].tile_type = "M"
-                    break
+        if cells is None or isinstance(cells, np.ndarray) and cells.dtype == bool:
+            self.view_stale = True
+        else:
+            self.pending.append(cells)
 
-    def put_numbers(self):
+    def tile_codes(self, xs, ys):
         """
-        Assigns numbers to tiles based on the number of adjacent mines.
-        This method is called after mines have been placed on the board.
+        Finds which image shows each of the given tiles.
+
+        **Parameters**
+            xs: *numpy.ndarray[int]*
+                x coordinates of the tiles
+            ys: *numpy.ndarray[int]*
+                y coordinates of the tiles
+
+        **Returns**
+            *numpy.ndarray[int]*
+                The image index of every tile in assets.TILE_NAMES
         """
-        for x in range(default_row):
-            for y in range(default_col):
-                if self.board_element[x][y].tile_type != "M":
-                    mine_count = self.check_neighbors(x, y)
-                    # If we found a block that needs a number in it
-                    if mine_count > 0:
-                        self.board_element[x][y].img = tile_list[mine_count - 1]
-                        self.board_element[x][y].tile_type = "n"
+        state = self.cell_state(xs, ys)
+        state["adjacent"] = state["adjacent"].astype(np.intp)
+        return STATE_TILES[state_code(**state)]
 
-    def place_mines_post_first_click(self, first_click_x, first_click_y):
+    def draw_tiles(self, surface, xs, ys, camera):
         """
-        Places mines on the board after the first click.
-        This ensures that the first click we don't hit a mine.
+        Draws the given tiles on a surface through the camera, with a single blits call.
 
         **Parameters**
-            first_click_x: *int*
-                x coordinate of the first click
-            first_click_y: *int*
-                y coordinate of the first click
+            surface: *pygame.Surface*
+                The surface to draw on, in screen coordinates
+            xs: *numpy.ndarray[int]*
+                x coordinates of the tiles
+            ys: *numpy.ndarray[int]*
+                y coordinates of the tiles
+            camera: *Camera*
+                The camera giving the zoom and the scroll position
         """
-        # Define the safe zone around the first click
-        safe_zone = [(x, y) for x in range(first_click_x - 1, first_click_x + 2)
-                     for y in range(first_click_y - 1, first_click_y + 2)
-                     if 0 <= x < default_row and 0 <= y < default_col]
+        images = assets.manager.tiles(camera.tile_size)
+        images = [images[name] for name in assets.TILE_NAMES]
+        codes = self.tile_codes(xs, ys)
+        sx = xs * camera.tile_size - camera.x
+        sy = ys * camera.tile_size - camera.y
+        surface.blits([(images[code], (x, y)) for code, x, y in zip(codes.tolist(), sx.tolist(), sy.tolist())],
+                      doreturn=False)
 
-        mines_placed = 0
-        while mines_placed < num_mine:
-            x = random.randint(0, default_row - 1)
-            y = random.randint(0, default_col - 1)
+    def compose(self, target, x0, x1, y0, y1, camera):
+        """
+        Draws a block of tiles into the pixels of a surface with NumPy: the image index of
+        every tile picks its pixels out of the decoded atlas, with gathers over all the
+        tiles at once instead of a call per tile. The block is clipped to the surface.
 
-            if (x, y) not in safe_zone and self.board_element[x][y].tile_type == ".":
-                self.board_element[x][y].tile_type = "M"  # Change "X" to "M" to indicate mine
-                self.board_element[x][y].img = tile_mine  # Assign the mine image
-                mines_placed += 1
-        self.put_numbers()
+        **Parameters**
+            target: *numpy.ndarray*
+                Mapped pixels of the board surface indexed [y, x], in screen coordinates,
+                as pygame.surfarray.pixels2d(surface).T so rows are contiguous like in the surface
+            x0, x1: *int*
+                Tiles x0 <= x < x1 are drawn
+            y0, y1: *int*
+                Tiles y0 <= y < y1 are drawn
+            camera: *Camera*
+                The camera giving the zoom and the scroll position
+        """
+        size = camera.tile_size
+        ys, xs = np.meshgrid(np.arange(y0, y1), np.arange(x0, x1), indexing="ij")
+        codes = self.tile_codes(xs.ravel(), ys.ravel()).reshape(xs.shape)
+        pixels = assets.manager.pixels(size, self.board_surface, bg_color)
+        left, top = camera.tile_to_screen(x0, y0)
+        height, width = target.shape
+        # columns of the block inside the target
+        cut_x, right = max(0, -left), min((x1 - x0) * size, width - left)
+        if right <= cut_x:
+            return
+        # Pixel row py of every tile row at once: one gather of whole rows of pixels,
+        # written straight into every size-th row of the target
+        for py in range(size):
+            first = max(0, -(top + py) // size + (-(top + py) % size > 0))
+            last = min(y1 - y0, (height - 1 - top - py) // size + 1)
+            if last <= first:
+                continue
+            rows = pixels[:, py][codes[first:last]].reshape(last - first, (x1 - x0) * size)
+            start = top + first * size + py
+            target[start:start + (last - first - 1) * size + 1:size, left + cut_x:left + right] = rows[:, cut_x:right]
 
-    @staticmethod
-    def boundary_check(x, y):
+    def make_board(self, screen, camera=None):
         """
-        This is to check if we're inside the boards' boundary.
+        Draws the current state of the game board on the given screen.
+        This is responsible for displaying each tiles' current state, whether it's
+        a revealed mine, a number, a flag, or an unrevealed tile.
+        Only the tiles inside the camera view are drawn. The board surface keeps them
+        between frames: all of them are drawn again when the camera moved, otherwise
+        only the visible tiles that changed since the last call.
+        A whole view, or the box around many changed tiles, is composed in NumPy straight
+        into the board surface through surfarray; a few changed tiles are blitted one by one.
 
         **Parameters**
-            x: *int*
-                The x coordinate to check
-            y: *int*
-                The y coordinate to check
+            screen: *pygame.Surface*
+                The surface onto which the board is drawn
+            camera: *Camera*
+                The view over the board, default to full_camera() if the board has one
 
         **Returns**
-            check: *bool*
-                True if within the boundary, False otherwise
+            rects: *list[pygame.Rect]*
+                The regions of the screen that changed, empty if nothing did
         """
-        check = 0 <= x < default_row and 0 <= y < default_col
-        return check
+        if not self.lay_mine:  # Only generate the board if mines are laid
+            return []
+        if camera is None:
+            camera = self.full_camera()
+        if self.board_surface is None or self.board_surface.get_size() != screen.get_size():
+            self.board_surface = pygame.Surface(screen.get_size())
+            self.view_stale = True
+        if not (self.view_stale or self.pending) and camera.state == self.drawn_view:
+            return []
+        x0, x1, y0, y1 = camera.visible_tiles()
+        if self.view_stale or camera.state != self.drawn_view:
+            self.view_stale = False
+            self.drawn_view = camera.state
+            self.pending.clear()
+            left, top = camera.tile_to_screen(x0, y0)
+            right, bottom = camera.tile_to_screen(x1, y1)
+            width, height = self.board_surface.get_size()
+            if left > 0 or top > 0 or right < width or bottom < height:
+                # the tiles do not cover the whole view
+                self.board_surface.fill(bg_color)
+            pixels = pygame.surfarray.pixels2d(self.board_surface)
+            self.compose(pixels.T, x0, x1, y0, y1, camera)
+            del pixels
+            screen.blit(self.board_surface, (0, 0))
+            return [screen.get_rect()]
+        xs = np.concatenate([cells[0] for cells in self.pending])
+        ys = np.concatenate([cells[1] for cells in self.pending])
+        self.pending.clear()
+        # Changes outside the view are drawn when the camera gets there
+        visible = (xs >= x0) & (xs < x1) & (ys >= y0) & (ys < y1)
+        xs, ys = xs[visible], ys[visible]
+        if xs.size == 0:
+            return []
+        size = camera.tile_size
+        if xs.size <= DIRTY_RECT_LIMIT:
+            self.draw_tiles(self.board_surface, xs, ys, camera)
+            rects = [pygame.Rect(camera.tile_to_screen(x, y), (size, size))
+                     for x, y in zip(xs.tolist(), ys.tolist())]
+        else:
+            # Too many tiles to draw and push one by one, compose and push the box around them instead
+            bx0, bx1, by0, by1 = int(xs.min()), int(xs.max()) + 1, int(ys.min()), int(ys.max()) + 1
+            pixels = pygame.surfarray.pixels2d(self.board_surface)
+            self.compose(pixels.T, bx0, bx1, by0, by1, camera)
+            del pixels
+            left, top = camera.tile_to_screen(bx0, by0)
+            right, bottom = camera.tile_to_screen(bx1, by1)
+            rects = [pygame.Rect(left, top, right - left, bottom - top)]
+        screen_rect = screen.get_rect()
+        rects = [rect.clip(screen_rect) for rect in rects]
+        for rect in rects:
+            screen.blit(self.board_surface, rect, rect)
+        return rects
+
 
-    def check_neighbors(self, x, y):
+class GameBoard(BoardRenderer, MineField):
+    """
+    This class is a wrapper for the Minesweeper game board.
+    The rules and the state of the tiles come from the headless MineField engine,
+    this class adds what is needed to draw the board with pygame.
+    Tile objects are only views produced on demand.
+
+    **Attributes**
+        board_element: *TileGrid*
+            A 2D view of tile objects representing the game board
+        unsaved_rows: *numpy.ndarray[bool]*
+            Whether each row along x changed since the game was last saved
+    """
+
+    def __init__(self, rows=default_row, cols=default_col, mines=num_mine, seed=None):
         """
-        Counts the number of neighboring mines adjacent to our tile of interest.
+        Initialization of the GameBoard
+
+        **Parameters**
+            rows: *int*
+                Number of tiles along x, default to the settings
+            cols: *int*
+                Number of tiles along y, default to the settings
+            mines: *int*
+                Number of mines, default to the settings
+            seed: *int*
+                Seed of the random mine placement, for reproducible boards.
+                A fresh random board is made if not given.
+        """
+        BoardRenderer.__init__(self)
+        MineField.__init__(self, rows, cols, mines, seed)
+        self.board_element = TileGrid(self)
+        self.unsaved_rows = np.ones(rows, dtype=bool)
+        # self.lay_mines()
+
+    def tile(self, x, y):
+        """
+        Gives a view of a single tile.
 
         **Parameters**
             x: *int*
@@ -195,84 +451,77 @@ class GameBoard:
                 y coordinate of the tile
 
         **Returns**
-            mine_count: *int*
-                The number of neighboring mines
-        """
-        mine_count = 0
-        # coordinates of the neighbors around our tile of interest
-        # starting from top left of it which is (-1,-1)
-        for x1 in range(-1, 2):
-            for y1 in range(-1, 2):
-                nb_x = x + x1
-                nb_y = y + y1
-                # check if neighbor is within boundary
-                if self.boundary_check(nb_x, nb_y):
-                    # check if neighbor is a mine
-                    if self.board_element[nb_x][nb_y].tile_type == "M":
-                        mine_count += 1
-        return mine_count
-
-    def make_board(self, screen):
+            *Tile*
+                The tile at the given coordinates
         """
-        Draws the current state of the game board on the given screen.
-        This is responsible for displaying each tiles' current state, whether it's
-        a revealed mine, a number, a flag, or an unrevealed tile.
+        return Tile(self, x, y)
+
+    def mark_dirty(self, cells):
+        """
+        Marks tiles whose look changed so that the next make_board redraws them.
 
         **Parameters**
-            screen: *pygame.Surface*
-                The surface onto which the board is drawn
+            cells: *numpy.ndarray*
+                Either flat indices of the tiles or a boolean mask of the board
         """
-        if self.lay_mine:  # Only generate the board if mines are laid
-            for r in self.board_element:
-                for tile in r:
-                    tile.make_board(self.board_surface)
-            screen.blit(self.board_surface, (0, 0))
+        if isinstance(cells, np.ndarray) and cells.dtype == bool:
+            BoardRenderer.mark_dirty(self, cells)
+            self.unsaved_rows[...] = True
+        else:
+            xs, ys = np.divmod(np.atleast_1d(cells), self.cols)
+            BoardRenderer.mark_dirty(self, (xs, ys))
+            self.unsaved_rows[xs] = True
+
+    def full_camera(self):
+        """
+        Gives a camera showing the whole board at the default tile size,
+        for callers of make_board that do not scroll.
 
-    def uncover(self, x, y):
+        **Returns**
+            *Camera*
+                The camera
         """
-        Uncovers a tile at the specific coordinates and performs actions based on the type pf tile.
-        If the tile is a mine, explodes.
-        If the tile is a number, reveals itself.
-        If the tile is a blank tile, it triggers a recursive uncovering of adjacent tiles.
+        return Camera(self.rows * tile_size, self.cols * tile_size, tile_size, self.rows, self.cols)
+
+    def cell_state(self, xs, ys):
+        """
+        Gathers the state of many tiles at once.
 
         **Parameters**
-            x: *int*
-                x coordinate of the tile to uncover
-            y: *int*
-                y coordinate of the tile to uncover
+            xs: *numpy.ndarray[int]*
+                x coordinates of the tiles
+            ys: *numpy.ndarray[int]*
+                y coordinates of the tiles
 
         **Returns**
-            *bool*
-                True if the uncover action is successful and safe
-                False if a mine is uncovered
-        """
-        self.uncover_history.append((x, y))
-        # If we uncover and hit a mine, mine explodes
-        if self.board_element[x][y].tile_type == "M":
-            self.board_element[x][y].reveal = True
-            self.board_element[x][y].img = tile_mine_explode
-            return False
-        # If we uncover and hit a number
-        elif self.board_element[x][y].tile_type == "n":
-            self.board_element[x][y].reveal = True
-            return True
-        self.board_element[x][y].reveal = True
-        # Recursively run this loop when we uncover and hit a blank tile
-        # This loop will stop when it finds a number
-        for r in range(max(0, x - 1), min(default_row - 1, x + 1) + 1):
-            for c in range(max(0, y - 1), min(default_col - 1, y + 1) + 1):
-                # check if the coordinate is already explored
-                if (r, c) not in self.uncover_history:
-                    self.uncover(r, c)
-        return True
-
-    def show_board(self):
-        """
-        Prints the current state of the board to the console.
-        Useful for debugging.
-        """
-        for r in self.board_element:
-            print(r)
+            *dict[str, numpy.ndarray]*
+                The mine, adjacent, revealed, flagged, exploded and wrong_flag value of every tile
+        """
+        if xs.size:
+            # a resumed board reads the rows shown for the first time
+            self.need_rows(int(xs.min()), int(xs.max()) + 1)
+        return {name: getattr(self, name)[xs, ys]
+                for name in ("mine", "adjacent", "revealed", "flagged", "exploded", "wrong_flag")}
+
+
+class EndlessGameBoard(BoardRenderer, EndlessField):
+    """
+    This class is the board of the endless mode, an EndlessField drawn with pygame.
+    Chunks are made as soon as the camera shows them.
+    """
+
+    def __init__(self, seed=None):
+        """
+        Initialization of the EndlessGameBoard
+
+        **Parameters**
+            seed: *int*
+                Seed of the board, the same seed always gives the same mines.
+                A random board is made if not given.
+        """
+        BoardRenderer.__init__(self)
+        EndlessField.__init__(self, seed)
+
 
 ################Yuqing Lu########################################################
 
@@ -285,101 +534,397 @@ class PygameGame:
         settings (module): An instance of the Settings module, containing configurations like screen size, title, and FPS.
         screen (pygame.Surface): The main screen surface for drawing graphical elements of the game.
         clock (pygame.time.Clock): A clock to regulate the game's frame rate.
-        board (GameBoard): The game board, an instance of the GameBoard class.
+        rows (int): Number of tiles along x of the boards of this game.
+        cols (int): Number of tiles along y of the boards of this game.
+        mines (int): Number of mines on the boards of this game.
+        endless (bool): A flag for the endless mode, played on an EndlessGameBoard.
+        seed (int): Seed of the boards of this game, None for random boards.
+        pool (BoardPool): Boards solvable without guessing generated ahead in worker processes, None for the usual boards.
+        preparer (ThreadPoolExecutor): A background thread building the board of the next game.
+        next_board (Future): The board of the next game being built, None if there is none.
+        prepare_boards (bool): A flag to build the board of the next game in the background while one is played.
+        record_path (str): File the replay of the game is saved to when it ends, None to not save it.
+        recorder (Recorder): The replay of the current game, None for endless games and replays.
+        save_path (str): File the game is saved to with F5, None to disable saving.
+        save_file (SaveFile): The open save file, written in full on the first save and only the changes after.
+        board (GameBoard): The game board, an instance of the GameBoard class, None until a game starts.
+        camera (Camera): The view over the board, scrolled and zoomed by the player.
         is_playing (bool): A flag to determine if the game is currently active.
         start_time (int): Variable to track the start time of the game.
+        full_redraw (bool): A flag to draw the whole screen on the next frame instead of the changed tiles.
+        hud (Hud): The timer, mine counter, FPS readout and frame time overlay drawn over the board.
+        profiler (Profiler): Times the game loop phases and board operations, None when profiling is off.
+        trace_path (str): File the profiler writes a Chrome trace to when the game exits, None for no trace.
+        latency (LatencyTracker): Measures the time from each click to its display, None when it is not measured.
+        events_time (int): perf_counter_ns time the events being handled were taken from the queue.
         first_click (bool): A flag to indicate whether the first click has occurred.
         won (bool): A flag to indicate whether the player has won the game.
     """
 
-    def __init__(self):
+    def __init__(self, rows=None, cols=None, mines=None, endless=False, seed=None, no_guess=False, record_path=None,
+                 save_path=None, profile=False, trace_path=None, latency=False, prepare_boards=True):
         pygame.init()
         self.settings = settings
-        # set the width and weight from the setting file
-        self.screen = pygame.display.set_mode((self.settings.default_width, self.settings.default_height))
+        # board size and mine count, default to the setting file
+        self.rows = rows or self.settings.default_row
+        self.cols = cols or self.settings.default_col
+        self.mines = self.settings.num_mine if mines is None else mines
+        self.endless = endless
+        self.seed = seed
+        self.record_path = record_path
+        self.recorder = None
+        self.save_path = save_path
+        self.save_file = None
+        self.pool = None
+        if no_guess and not endless:
+            # start generating right away, so a board is ready by the time the window is
+            self.pool = BoardPool(seed=seed)
+            self.pool.fill(self.rows, self.cols, self.mines)
+        self.preparer = ThreadPoolExecutor(max_workers=1)
+        self.next_board = None
+        self.prepare_boards = prepare_boards
+        # the board of the first game is built in the background while the window opens,
+        # start_new_game, load_game or play_replay then sets it
+        self.board = None
+        self.prepare_next_board()
+        if self.endless:
+            # an endless board fills the largest window and scrolls without limit
+            self.screen = pygame.display.set_mode((self.settings.max_width, self.settings.max_height))
+            self.camera = Camera(self.screen.get_width(), self.screen.get_height(), self.settings.tile_size)
+            self.camera.center_on(0, 0)
+        else:
+            # set the width and weight from the board size, up to the largest window in the setting file
+            self.screen = pygame.display.set_mode((min(self.rows * self.settings.tile_size, self.settings.max_width),
+                                                   min(self.cols * self.settings.tile_size, self.settings.max_height)))
+            self.camera = Camera(self.screen.get_width(), self.screen.get_height(), self.settings.tile_size,
+                                 self.rows, self.cols)
+        # holding an arrow key keeps scrolling
+        pygame.key.set_repeat(200, 25)
         # set the window title according to setting
         pygame.display.set_caption(self.settings.title)
         # set a clock to count the time
         self.clock = pygame.time.Clock()
-        self.board = GameBoard()
         self.is_playing = False
         self.start_time = None
         self.first_click = True
         # Set win status to True
         self.won = True
+        # The first frame of a game draws the whole screen
+        self.full_redraw = True
+        self.hud = Hud(self.screen.get_width(), self.settings.white, show_fps=self.settings.show_fps)
+        # Nothing is timed unless the profiler is on, see start_profiler
+        self.profiler = None
+        self.trace_path = trace_path
+        self.latency = None
+        self.events_time = None
+        if latency:
+            # the histograms are printed when the game exits
+            self.latency = LatencyTracker()
+            atexit.register(lambda: print(self.latency.report()))
+        if profile or trace_path:
+            self.start_profiler()
+        if profile:
+            self.hud.toggle_perf()
+
+    def new_board(self):
+        """
+        Creates an empty board for the mode, size and mine count of this game.
+        A board prepared in the background is used when there is one.
+
+        Returns:
+            GameBoard or EndlessGameBoard: The new board.
+        """
+        if self.next_board is not None:
+            board = self.next_board.result()
+            self.next_board = None
+            return board
+        if self.endless:
+            return EndlessGameBoard(self.seed)
+        return GameBoard(self.rows, self.cols, self.mines, self.board_seed())
+
+    def board_seed(self):
+        """
+        Gives the seed of a new board: the seed of this game, or a random one so that
+        every board can be replayed from its seed.
+
+        Returns:
+            int: The seed.
+        """
+        return self.seed if self.seed is not None else secrets.randbits(63)
+
+    def build_board(self):
+        """
+        Builds the board of the next game with a candidate mine layout and its numbers,
+        so the first click only has to move the mines out of its safe zone.
+        Runs in the background thread.
+
+        Returns:
+            GameBoard: The new board.
+        """
+        board = GameBoard(self.rows, self.cols, self.mines, self.board_seed())
+        board.prepare_mines()
+        return board
+
+    def prepare_next_board(self):
+        """
+        Starts building the board of the next game in the background, while this one is played.
+        Endless boards make their mines chunk by chunk and no-guess boards come from the pool,
+        so neither is prepared here, and nothing is when prepare_boards is off.
+        """
+        if self.prepare_boards and not self.endless and self.pool is None:
+            self.next_board = self.preparer.submit(self.build_board)
 
     def start_new_game(self):
         """
         Initializes and starts a new game of Minesweeper.
         Resets the game board, the start time, and relevant game flags.
+        In no-guess mode the board comes ready from the pool, with its start tile uncovered.
         """
-        self.board = GameBoard()
+        self.board = self.new_board()
+        self.attach_board()
+        self.prepare_next_board()
+        self.first_click = True
+        self.recorder = None
+        self.close_save()
+        if not self.endless and self.pool is None:
+            self.recorder = Recorder(self.rows, self.cols, self.mines, seed=self.board.seed)
+        if self.pool is not None:
+            layout = self.pool.get(self.rows, self.cols, self.mines)
+            self.board.set_mines(layout.mines)
+            # no-guess boards do not come from their seed, the replay keeps the mines
+            self.recorder = Recorder(self.rows, self.cols, self.mines, mine_mask=self.board.mine)
+            self.recorder.record(REVEAL, *layout.start, 0)
+            self.board.lay_mine = True
+            self.first_click = False
+            self.board.uncover(*layout.start)
+            self.camera.center_on(*layout.start)
         # self.board.show_board()
         self.start_time = pygame.time.get_ticks()
+        self.full_redraw = True
 
     def game_loop(self):
         """
         The main game loop. Handles the sequence of actions that occur during the game.
         This includes event handling, screen updating, and timer rendering.
         Continues until the game ends.
+        The loop sleeps until an input event comes or the timer has to show the next
+        second, and only draws what changed, so an idle game uses no CPU.
         """
         self.is_playing = True
+        self.allow_events()
         while self.is_playing:
-            self.clock.tick(self.settings.FPS)
-            self.handle_events()
             self.update_screen()
             self.render_timer()
+            # the time spent waiting for input is not part of the frame
+            if self.profiler is not None:
+                self.profiler.end_frame()
+            events = self.wait_events(self.next_timer_change())
+            if self.profiler is not None:
+                self.profiler.begin_frame()
+            self.clock.tick()
+            self.handle_events(events)
         else:
             self.show_end_screen()
 
+    def start_profiler(self):
+        """
+        Starts timing the game loop phases and the board operations.
+        With a trace path, the trace is written when the game exits.
+        """
+        if self.profiler is not None:
+            return
+        self.profiler = Profiler()
+        self.profiler.attach(self, GAME_SPANS)
+        if self.latency is not None:
+            self.latency.profiler = self.profiler
+        self.attach_board()
+        if self.trace_path:
+            atexit.register(self.profiler.save, self.trace_path)
+
+    def stop_profiler(self):
+        """
+        Stops timing, putting the methods of the game and its board back as they were.
+        """
+        if self.profiler is None:
+            return
+        Profiler.detach(self, GAME_SPANS)
+        if self.board is not None:
+            Profiler.detach(self.board, BOARD_SPANS)
+        self.profiler = None
+        if self.latency is not None:
+            self.latency.profiler = None
+
+    def attach_board(self):
+        """
+        Times the operations of the current board, if the profiler is on.
+        """
+        if self.profiler is not None and self.board is not None:
+            self.profiler.attach(self.board, BOARD_SPANS)
+
+    def toggle_profiler(self):
+        """
+        Shows or hides the frame time overlay. Showing it starts the profiler, and hiding
+        it stops the profiler again unless a trace is being recorded.
+        """
+        self.hud.toggle_perf()
+        if self.hud.perf.visible:
+            self.start_profiler()
+        elif not self.trace_path:
+            self.stop_profiler()
+
+    def allow_events(self):
+        """
+        Restricts the event queue to the events the game handles, so that other
+        events neither wake the loop up nor fill the queue.
+        """
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed(HANDLED_EVENTS)
+
+    def next_timer_change(self):
+        """
+        Computes how long the HUD stays the same: until the timer shows the next second,
+        or the next frame while the FPS readout or the frame time overlay is shown.
+
+        Returns:
+            int: Milliseconds to wait, None to wait for input only.
+        """
+        if self.hud.fps.visible or self.hud.perf.visible:
+            return 1000 // self.settings.FPS
+        if self.start_time is None:
+            return None
+        return 1000 - (pygame.time.get_ticks() - self.start_time) % 1000
+
+    def wait_events(self, timeout=None):
+        """
+        Sleeps until an event comes or the timeout passes, then takes every queued event.
+        The time they were taken is kept in events_time, as the time of the clicks among them.
+
+        Attributes:
+            timeout (int): Milliseconds to wait at most, None to wait for an event.
+
+        Returns:
+            list[pygame.event.Event]: The events, empty if the timeout passed.
+        """
+        event = pygame.event.wait() if timeout is None else pygame.event.wait(max(1, int(timeout)))
+        events = [] if event.type == pygame.NOEVENT else [event]
+        events.extend(pygame.event.get())
+        self.events_time = perf_counter_ns()
+        return events
+
     def update_screen(self):
         """
-        Updates the game screen. Clears the screen, renders the board, and updates the display.
+        Updates the game screen. Renders the tiles of the board that changed and pushes
+        only those regions to the display. The screen is cleared and flipped as a whole
+        only for the first frame of a game.
+
+        Returns:
+            list[pygame.Rect]: The regions of the display that were updated.
         """
-        self.screen.fill(self.settings.bg_color)
-        self.board.make_board(self.screen)
-        pygame.display.flip()
+        if self.full_redraw:
+            self.screen.fill(self.settings.bg_color)
+            self.board.view_stale = True
+        rects = self.board.make_board(self.screen, self.camera)
+        if self.full_redraw:
+            self.full_redraw = False
+            rects = [self.screen.get_rect()]
+            pygame.display.flip()
+        elif rects:
+            pygame.display.update(rects)
+        if rects:
+            # The board was drawn over the HUD fields in these regions
+            self.hud.invalidate(rects)
+            # the tiles changed by the last clicks are now on the display
+            if self.latency is not None:
+                self.latency.presented()
+        return rects
 
     def render_timer(self):
         """
-        Renders the timer on the game screen. Calculates elapsed time and displays it.
+        Renders the timer on the game screen, along with the other HUD fields.
+        Calculates elapsed time and pushes the HUD regions to the display
+        only when a displayed value changed.
         """
         elapsed_time = (pygame.time.get_ticks() - self.start_time) // 1000  # Convert milliseconds to seconds
-        timer_font = pygame.font.Font(None, 36)  # Choose an appropriate font and size
-        timer_surface = timer_font.render(str(elapsed_time), True, self.settings.white)  # Render the time as text
-        self.screen.blit(timer_surface, (10, 10))  # Position the timer on the screen
-        pygame.display.update()
+        self.hud.timer.set(elapsed_time)
+        self.hud.mines.set(self.board.mines_left)
+        if self.hud.fps.visible:
+            self.hud.fps.set(round(self.clock.get_fps()))
+        if self.hud.perf.visible:
+            self.hud.perf.set(self.profiler.summary())
+        rects = self.hud.draw(self.screen, self.board.board_surface)
+        if rects:
+            pygame.display.update(rects)
 
     def check_victory(self):
         """
         Checks if the player has won the game.
         Victory is achieved when all non-mine tiles are revealed.
+        The board keeps count of the non-mine tiles left to reveal, so this is a
+        constant time check. An endless board is never won.
 
         Returns:
             bool: True if the player has won, False otherwise.
         """
-        for row in self.board.board_element:
-            for tile in row:
-                # If a non-mine tile is not revealed, return False
-                if tile.tile_type != "M" and not tile.reveal:
-                    return False
-        # If all non-mine tiles are revealed, return True
-        return True
+        return self.board.won
+
+    def handle_window_event(self, event):
+        """
+        Answers the events of the window itself, in every loop of the game.
+        Closing the window quits the game, uncovering it draws the whole screen again.
+
+        Attributes:
+            event (pygame.event.Event): The event to handle.
+        """
+        if event.type == pygame.QUIT:
+            self.is_playing = False
+            pygame.quit()
+            quit()
+        if event.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE):
+            self.full_redraw = True
 
-    def handle_events(self):
+    def handle_events(self, events=None):
         """
         Handles user input events, including mouse clicks and game closure.
         Processes left and right mouse clicks and checks for game victory.
+        Clicks are mapped to tiles through the camera. The arrow keys (or WASD) and
+        dragging with the middle button scroll the board, the mouse wheel zooms.
+        The F key shows or hides the FPS readout, the P key the frame time overlay, F5 saves the game.
+
+        Attributes:
+            events (list[pygame.event.Event]): The events to handle, default to the queued events.
         """
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                self.is_playing = False
-                pygame.quit()
-                quit()
+        if events is None:
+            events = pygame.event.get()
+            self.events_time = perf_counter_ns()
+        for event in events:
+            self.handle_window_event(event)
+
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_f:
+                self.hud.toggle_fps()
+
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_p:
+                self.toggle_profiler()
+
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F5:
+                self.save_game()
+
+            if event.type == pygame.KEYDOWN and event.key in PAN_KEYS:
+                dx, dy = PAN_KEYS[event.key]
+                self.camera.pan(dx * self.camera.tile_size, dy * self.camera.tile_size)
+
+            if event.type == pygame.MOUSEMOTION and event.buttons[1]:
+                self.camera.pan(-event.rel[0], -event.rel[1])
+
+            if event.type == pygame.MOUSEWHEEL:
+                self.camera.zoom(event.y, pygame.mouse.get_pos())
 
             if event.type == pygame.MOUSEBUTTONDOWN:
-                mx, my = pygame.mouse.get_pos()
-                x, y = mx // self.settings.tile_size, my // self.settings.tile_size
+                x, y = self.camera.screen_to_tile(*event.pos)
+                if not self.board.boundary_check(x, y):
+                    continue
+
+                if self.latency is not None:
+                    self.latency.click(self.board, self.events_time)
 
                 if event.button == 1:
                     self.left_click_action(x, y)
@@ -387,6 +932,9 @@ class PygameGame:
                 if event.button == 3:
                     self.right_click_action(x, y)
 
+                if self.latency is not None:
+                    self.latency.action(self.board)
+
         if self.check_victory():
             self.declare_victory()
 
@@ -399,15 +947,17 @@ class PygameGame:
             x (int): The x-coordinate (column) of the clicked tile.
             y (int): The y-coordinate (row) of the clicked tile.
         """
+        if self.recorder is not None:
+            self.recorder.record(REVEAL, x, y, pygame.time.get_ticks() - self.start_time)
         if self.first_click:
             self.board.place_mines_post_first_click(x, y)
             self.first_click = False
             self.board.lay_mine = True
-            self.board.show_board()
-        if not self.board.board_element[x][y].flag:
-            if not self.board.uncover(x, y):
-                self.explode_mines()
-                self.is_playing = False
+            # self.board.show_board()
+        # uncover leaves flagged tiles alone
+        if not self.board.uncover(x, y):
+            self.explode_mines()
+            self.is_playing = False
 
     def right_click_action(self, x, y):
         """
@@ -418,9 +968,8 @@ class PygameGame:
             x (int): The x-coordinate (column) of the clicked tile.
             y (int): The y-coordinate (row) of the clicked tile.
         """
-        tile = self.board.board_element[x][y]
-        if not tile.reveal:
-            tile.flag = not tile.flag
+        if self.board.toggle_flag(x, y) and self.recorder is not None:
+            self.recorder.record(FLAG, x, y, pygame.time.get_ticks() - self.start_time)
 
     def explode_mines(self):
         """
@@ -430,15 +979,7 @@ class PygameGame:
         """
         # if exploded, set the status to false
         self.won = False
-        for row in self.board.board_element:
-            for tile in row:
-                if tile.tile_type == "M":
-                    tile.reveal = True  # Reveal all mines
-                    # tile.img = self.settings.tile_mine  # Show mine image
-                if tile.flag and tile.tile_type != "M":
-                    tile.flag = False
-                    tile.reveal = True
-                    tile.img = self.settings.tile_mine_wrong
+        self.board.explode_mines()
 
     def show_end_screen(self):
         """
@@ -452,6 +993,8 @@ class PygameGame:
         else:
             message = "Game Over!"
         print(message + f" Time used: {total_time} seconds")
+        if self.record_path and self.recorder is not None:
+            self.recorder.save(self.record_path)
         # Render total time on screen
         font = pygame.font.Font(None, 36)
         message_surface = font.render(message, True, self.settings.white)
@@ -462,14 +1005,101 @@ class PygameGame:
 
         # Show the final state of the board
         end_time = pygame.time.get_ticks() + 120000  # 2 minutes
+        messages_shown = False
+        self.allow_events()
         while pygame.time.get_ticks() < end_time:
-            self.update_screen()
-            self.screen.blit(message_surface, (self.settings.default_width // 2, 20))  # Adjust position as needed
-            self.screen.blit(time_surface, (self.settings.default_width // 2, 60))  # Adjust position as needed
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    exit()
+            if self.update_screen() or not messages_shown:
+                # Draw the messages again over the tiles that were just redrawn
+                message_rect = self.screen.blit(message_surface, (self.screen.get_width() // 2, 20))  # Adjust position as needed
+                time_rect = self.screen.blit(time_surface, (self.screen.get_width() // 2, 60))  # Adjust position as needed
+                pygame.display.update([message_rect, time_rect])
+                messages_shown = True
+            # sleep until something happens or the end screen times out
+            for event in self.wait_events(end_time - pygame.time.get_ticks()):
+                self.handle_window_event(event)
+
+    def save_game(self):
+        """
+        Saves the game to save_path. The first save writes the whole board, the next ones
+        only the rows that changed since. Endless games are not saved.
+        """
+        if not self.save_path or self.endless or self.start_time is None:
+            return
+        elapsed = pygame.time.get_ticks() - self.start_time
+        view_state = {"tile_size": self.camera.tile_size, "camera": [self.camera.x, self.camera.y]}
+        if self.save_file is None:
+            self.save_file = SaveFile.create(self.save_path, self.board, elapsed, view_state)
+        else:
+            self.save_file.update(self.board, np.flatnonzero(self.board.unsaved_rows), elapsed, view_state)
+        self.board.unsaved_rows[...] = False
+
+    def close_save(self):
+        """
+        Closes the save file of the previous game, so the next save writes the new board in full.
+        """
+        if self.save_file is not None:
+            self.save_file.close()
+            self.save_file = None
+
+    def load_game(self, path):
+        """
+        Resumes a saved game, with its clock, seed and camera. Later saves go to the same file.
+
+        Attributes:
+            path (str): The save file, of the board size and mine count of this game.
+        """
+        self.close_save()
+        save = SaveFile(path, writable=True)
+        seed = save.settings.get("seed")
+        self.board = GameBoard(save.rows, save.cols, save.num_mine, seed)
+        save.load_into(self.board)
+        self.attach_board()
+        self.board.unsaved_rows[...] = False
+        self.first_click = not self.board.mines_placed
+        # a resumed game cannot be replayed from its first click
+        self.recorder = None
+        self.save_path = path
+        self.save_file = save
+        self.camera.tile_size = save.settings.get("tile_size", self.camera.tile_size)
+        self.camera.x, self.camera.y = save.settings.get("camera", (0, 0))
+        self.camera.clamp()
+        self.start_time = pygame.time.get_ticks() - save.elapsed_ms
+        self.full_redraw = True
+
+    def play_replay(self, replay, speed=1.0):
+        """
+        Plays back a recorded game in the window at real speed, then shows the end screen.
+        Every action goes through the same click handlers as a player's clicks.
+
+        Attributes:
+            replay (Replay): The recorded game, of the board size and mine count of this game.
+            speed (float): How many times faster than real time to play.
+        """
+        self.board = GameBoard(replay.rows, replay.cols, replay.mines, replay.seed)
+        replay.setup(self.board)
+        self.attach_board()
+        self.first_click = not self.board.mines_placed
+        self.recorder = None
+        self.start_time = pygame.time.get_ticks()
+        self.full_redraw = True
+        self.is_playing = True
+        self.allow_events()
+        for i in range(len(replay)):
+            # keep drawing and answering the window until the action is due
+            while (due := replay.times[i] / speed - (pygame.time.get_ticks() - self.start_time)) > 0:
+                self.update_screen()
+                self.render_timer()
+                for event in self.wait_events(min(due, self.next_timer_change())):
+                    self.handle_window_event(event)
+            x, y = divmod(int(replay.cells[i]), replay.cols)
+            if replay.kinds[i] == FLAG:
+                self.right_click_action(x, y)
+            else:
+                self.left_click_action(x, y)
+            if not self.is_playing or self.check_victory():
+                break
+        self.update_screen()
+        self.show_end_screen()
 
     def declare_victory(self):
         """
@@ -479,6 +1109,41 @@ class PygameGame:
 
 
 if __name__ == "__main__":
-    game = PygameGame()
-    game.start_new_game()
-    game.game_loop()
+    parser = argparse.ArgumentParser(description=settings.title)
+    parser.add_argument("--rows", type=int, help="number of tiles along x")
+    parser.add_argument("--cols", type=int, help="number of tiles along y")
+    parser.add_argument("--mines", type=int, help="number of mines")
+    parser.add_argument("--seed", type=int, help="seed of the boards, for reproducible games")
+    parser.add_argument("--endless", action="store_true", help="play on an endless board")
+    parser.add_argument("--no-guess", action="store_true", help="only play boards that can be solved without guessing")
+    parser.add_argument("--record", metavar="PATH", help="save a replay of the game to this file")
+    parser.add_argument("--replay", metavar="PATH", help="play back a replay file instead of playing")
+    parser.add_argument("--speed", type=float, default=1.0, help="playback speed of --replay")
+    parser.add_argument("--save", metavar="PATH", help="file the game is saved to with F5")
+    parser.add_argument("--load", metavar="PATH", help="resume a saved game, F5 saves it again")
+    parser.add_argument("--profile", action="store_true", help="time every frame and show the overlay, P toggles it")
+    parser.add_argument("--trace", metavar="PATH", help="write a Chrome trace of the game to this file on exit")
+    parser.add_argument("--latency", action="store_true", help="print click to display latency histograms on exit")
+    args = parser.parse_args()
+    if args.endless and args.no_guess:
+        parser.error("--no-guess does not apply to the endless mode")
+    if args.replay:
+        replay = Replay.load(args.replay)
+        # the replay makes its own board, none is built in the background
+        game = PygameGame(replay.rows, replay.cols, replay.mines, profile=args.profile, trace_path=args.trace,
+                          latency=args.latency, prepare_boards=False)
+        game.play_replay(replay, args.speed)
+    elif args.load:
+        with SaveFile(args.load) as save:
+            rows, cols, mines = save.rows, save.cols, save.num_mine
+        game = PygameGame(rows, cols, mines, profile=args.profile, trace_path=args.trace,
+                          latency=args.latency, prepare_boards=False)
+        game.load_game(args.load)
+        game.game_loop()
+    else:
+        game = PygameGame(args.rows, args.cols, args.mines, endless=args.endless, seed=args.seed,
+                          no_guess=args.no_guess, record_path=args.record, save_path=args.save,
+                          profile=args.profile, trace_path=args.trace,
+                          latency=args.latency)
+        game.start_new_game()
+        game.game_loop()
@@ -0,0 +1,328 @@
+"""
+This code computes the chance that each tile of a Minesweeper board holds a mine.
+1. Tiles next to clues (the frontier) are split into independent components
+2. Each component is enumerated exactly, by backtracking with memoization
+3. Components are combined with the mines left elsewhere by binomial weighting
+
+The result of every component is cached, so after a reveal only the components
+whose clues changed are enumerated again.
+"""
+
+import sys
+import weakref
+from math import comb
+
+import numpy as np
+
+from solver import CLUE, MINE, UNKNOWN, Solver
+
+
+def enumerate_component(cells, constraints):
+    """
+    Counts the mine layouts of a component that agree with its clues.
+    Tiles are assigned one at a time; the layouts of the tiles left only depend on
+    the mines still missing around the clues that are started but not finished, so
+    they are memoized on that.
+
+    **Parameters**
+        cells: *list[int]*
+            Tiles of the component, in an order where clues are finished soon after they are started
+        constraints: *list[tuple[list[int], int]]*
+            Every clue as the positions in cells of its unknown tiles and the mines missing among them
+
+    **Returns**
+        *dict[int, tuple[int, list[int]]]*
+            For each possible number of mines in the component, the number of layouts
+            and, for every tile, the number of those layouts with a mine on it
+    """
+    n = len(cells)
+    of_cell = [[] for _ in range(n)]
+    first = [n] * len(constraints)
+    last = [-1] * len(constraints)
+    for c, (members, _) in enumerate(constraints):
+        for i in members:
+            of_cell[i].append(c)
+        first[c], last[c] = min(members), max(members)
+    # Tiles of each clue from position i onward, to stop early on a clue that can no longer be met
+    left = [[sum(1 for j in constraints[c][0] if j >= i) for c in of_cell[i]] for i in range(n)]
+    # Clues started before position i and finished at or after it
+    active = [[c for c in range(len(constraints)) if first[c] < i <= last[c]] for i in range(n + 1)]
+    missing = [m for _, m in constraints]
+    memo = {}
+
+    def layouts(i):
+        if i == n:
+            return {0: (1, [])}
+        key = (i, tuple(missing[c] for c in active[i]))
+        result = memo.get(key)
+        if result is not None:
+            return result
+        result = {}
+        for mine in (0, 1):
+            if any(missing[c] < mine or missing[c] - mine > count - 1 or (last[c] == i and missing[c] != mine)
+                   for c, count in zip(of_cell[i], left[i])):
+                continue
+            for c in of_cell[i]:
+                missing[c] -= mine
+            for k, (ways, counts) in layouts(i + 1).items():
+                total, total_counts = result.get(k + mine, (0, None))
+                counts = [ways * mine] + counts
+                if total_counts is not None:
+                    counts = [a + b for a, b in zip(total_counts, counts)]
+                result[k + mine] = (total + ways, counts)
+            for c in of_cell[i]:
+                missing[c] += mine
+        memo[key] = result
+        return result
+
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(limit, n + 100))
+    try:
+        return layouts(0)
+    finally:
+        sys.setrecursionlimit(limit)
+
+
+class ProbabilityEngine:
+    """
+    This class gives the probability of a mine on every tile of a MineField,
+    from what the player sees, the same way the Solver does.
+
+    **Attributes**
+        field: *MineField*
+            The board
+        solver: *Solver*
+            The solver keeping the tiles known for sure, flags are not trusted
+        cache: *dict*
+            The layouts of every component, by the clues of the component
+        enumerated: *int*
+            Number of components enumerated since the engine was made, cached ones excluded
+    """
+
+    def __init__(self, field, solver=None):
+        """
+        ProbabilityEngine initialization.
+
+        **Parameters**
+            field: *MineField*
+                The board
+            solver: *Solver*
+                A solver of the board to share, a new one is made if not given
+        """
+        self.field = field
+        self.solver = solver if solver is not None else Solver(field, trust_flags=False)
+        self.cache = {}
+        self.enumerated = 0
+
+    def components(self):
+        """
+        Splits the clues that still have unknown tiles into components which share no tile.
+
+        **Returns**
+            *list[list[tuple[int, list[int], int]]]*
+                Every component as its clues, each a padded index, its unknown tiles and the mines missing
+        """
+        solver = self.solver
+        status = solver.board_status()
+        # Clues with an unknown neighbor, found without a Python loop over the board
+        unknown = np.pad(status == UNKNOWN, 1)
+        near = np.zeros_like(unknown)
+        for dx in range(-1, 2):
+            for dy in range(-1, 2):
+                near[1:-1, 1:-1] |= unknown[1 + dx:unknown.shape[0] - 1 + dx, 1 + dy:unknown.shape[1] - 1 + dy]
+        clues = solver.to_padded(np.flatnonzero((status == CLUE) & near[1:-1, 1:-1])).tolist()
+        # Union find over the unknown tiles, joined through the clues they share
+        parent = {}
+
+        def find(p):
+            while parent[p] != p:
+                parent[p] = parent[parent[p]]
+                p = parent[p]
+            return p
+
+        constraints = []
+        for p in clues:
+            cells, missing = solver.constraint(p)
+            constraints.append((p, cells, missing))
+            for q in cells:
+                parent.setdefault(q, q)
+            root = find(cells[0])
+            for q in cells[1:]:
+                parent[find(q)] = root
+        groups = {}
+        for constraint in constraints:
+            groups.setdefault(find(constraint[1][0]), []).append(constraint)
+        return list(groups.values())
+
+    def component_layouts(self, component):
+        """
+        Gives the layouts of a component, from the cache when its clues did not change.
+
+        **Parameters**
+            component: *list[tuple[int, list[int], int]]*
+                The clues of the component, see components
+
+        **Returns**
+            cells: *list[int]*
+                Padded indices of the tiles of the component
+            layouts: *dict[int, tuple[int, list[int]]]*
+                See enumerate_component
+        """
+        key = component_key(component)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        # Order the tiles along the clues, so each clue is finished soon after it is started
+        order = {}
+        for _, cells, _ in sorted(component):
+            for q in cells:
+                order.setdefault(q, len(order))
+        cells = list(order)
+        constraints = [([order[q] for q in cells_of], missing) for _, cells_of, missing in component]
+        result = self.cache[key] = (cells, enumerate_component(cells, constraints))
+        self.enumerated += 1
+        return result
+
+    def probabilities(self):
+        """
+        Computes the probability of a mine on every tile, after bringing the solver up to date.
+
+        **Returns**
+            *numpy.ndarray[float]*
+                Probabilities indexed by [x, y]: 0 on revealed and known safe tiles, 1 on known mines
+
+        **Raises**
+            ValueError
+                If no layout of the mines agrees with the clues
+        """
+        solver = self.solver
+        solver.update()
+        status = solver.board_status()
+        result = np.zeros(status.shape)
+        result[status == MINE] = 1.0
+        components = self.components()
+        used = {}
+        parts = []
+        for component in components:
+            cells, layouts = used[component_key(component)] = self.component_layouts(component)
+            if not layouts:
+                raise ValueError("No layout of the mines agrees with the clues")
+            parts.append((cells, layouts))
+        # Only the components still on the board are kept
+        self.cache = used
+        frontier = sum(len(cells) for cells, _ in parts)
+        outside = int(np.count_nonzero(status == UNKNOWN)) - frontier
+        mines = self.field.num_mine - int(np.count_nonzero(status == MINE))
+        # Number of layouts of the mines left outside the frontier, for each number of mines in it
+        outside_ways = [comb(outside, mines - k) if 0 <= mines - k <= outside else 0 for k in range(mines + 1)]
+        # Mines over all the components but one, from the products before and after it
+        before = [{0: 1}]
+        for _, layouts in parts:
+            before.append(convolve(before[-1], {k: ways for k, (ways, _) in layouts.items()}))
+        after = {0: 1}
+        total = sum(ways * outside_ways[k] for k, ways in before[-1].items() if k <= mines)
+        if total == 0:
+            raise ValueError("No layout of the mines agrees with the clues")
+        for j in range(len(parts) - 1, -1, -1):
+            cells, layouts = parts[j]
+            others = convolve(before[j], after)
+            weight = {k: sum(ways * outside_ways[k + r] for r, ways in others.items() if k + r <= mines)
+                      for k in layouts}
+            counts = [0] * len(cells)
+            for k, (_, cell_counts) in layouts.items():
+                counts = [a + b * weight[k] for a, b in zip(counts, cell_counts)]
+            for q, count in zip(cells, counts):
+                result[solver.to_tile(q)] = count / total
+            after = convolve(after, {k: ways for k, (ways, _) in layouts.items()})
+        if outside:
+            # Mines expected outside the frontier, shared evenly by its tiles
+            expected = sum(ways * outside_ways[k] * (mines - k) for k, ways in before[-1].items() if k <= mines)
+            frontier_mask = np.zeros(status.shape, dtype=bool)
+            for cells, _ in parts:
+                frontier_mask[tuple(np.array([solver.to_tile(q) for q in cells]).T)] = True
+            result[(status == UNKNOWN) & ~frontier_mask] = expected / total / outside
+        return result
+
+    def best_guess(self):
+        """
+        Finds the tile to uncover: a safe tile if one is known, otherwise the tile
+        least likely to hold a mine.
+
+        **Returns**
+            *tuple[int, int]*
+                Coordinates of the tile, None if every tile is revealed or a known mine
+        """
+        self.solver.update()
+        if self.solver.safe:
+            return self.solver.to_tile(min(self.solver.safe))
+        probabilities = self.probabilities()
+        if self.solver.safe:
+            return self.solver.to_tile(min(self.solver.safe))
+        probabilities[self.solver.board_status() != UNKNOWN] = np.inf
+        best = int(np.argmin(probabilities))
+        if not np.isfinite(probabilities.ravel()[best]):
+            return None
+        return divmod(best, self.field.cols)
+
+
+def component_key(component):
+    """
+    Gives the key of a component in the cache: its clues, their unknown tiles and the mines missing.
+
+    **Parameters**
+        component: *list[tuple[int, list[int], int]]*
+            The clues of the component, see ProbabilityEngine.components
+
+    **Returns**
+        *tuple*
+            A hashable key, equal for two components with the same layouts
+    """
+    return tuple(sorted((p, tuple(cells), missing) for p, cells, missing in component))
+
+
+def convolve(a, b):
+    """
+    Convolves two distributions of the number of mines.
+
+    **Parameters**
+        a: *dict[int, int]*
+            Number of layouts for each number of mines
+        b: *dict[int, int]*
+            Number of layouts for each number of mines
+
+    **Returns**
+        *dict[int, int]*
+            Number of layouts of both for each total number of mines
+    """
+    result = {}
+    for i, x in a.items():
+        for j, y in b.items():
+            result[i + j] = result.get(i + j, 0) + x * y
+    return result
+
+
+# Engines of the boards played by probability_policy, dropped with their board
+_engines = weakref.WeakKeyDictionary()
+
+
+def probability_policy(field, rng):
+    """
+    A player for batch.py that uncovers tiles deduced safe, and otherwise the tile
+    least likely to hold a mine. The first move is in the middle of the board.
+
+    **Parameters**
+        field: *MineField*
+            The board being played
+        rng: *numpy.random.Generator*
+            Random generator of the player, unused
+
+    **Returns**
+        *tuple[str, int, int]*
+            The move: "reveal" and the coordinates of the tile
+    """
+    if not field.mines_placed:
+        return "reveal", field.rows // 2, field.cols // 2
+    engine = _engines.get(field)
+    if engine is None:
+        engine = _engines[field] = ProbabilityEngine(field)
+    return ("reveal",) + engine.best_guess()
@@ -0,0 +1,387 @@
+"""
+This code times the phases of the game loop and the board operations.
+1. Methods are timed by wrapping them on one object, so nothing is timed and nothing
+   costs anything until the profiler is attached
+2. Every call is kept in a ring buffer, the oldest ones are overwritten
+3. Frame times give percentiles for the on-screen overlay, and the buffer can be
+   written as a Chrome trace (chrome://tracing or https://ui.perfetto.dev)
+4. Click to display latency, with a histogram for every kind of action
+"""
+
+import bisect
+import json
+import os
+from time import perf_counter_ns
+
+import numpy as np
+
+# Calls kept in the ring buffer
+CAPACITY = 65536
+# Frames kept for the percentiles
+FRAMES = 1024
+# Kinds of click measured by the LatencyTracker
+ACTIONS = ("reveal", "cascade", "flag", "loss")
+# Upper bounds of the latency histogram bins, in milliseconds
+LATENCY_BINS = (2, 4, 8, 16, 33, 50, 100, 200, 500)
+
+
+class Profiler:
+    """
+    This class records how long methods take, and how long each frame of the game takes.
+    The buffers are plain lists written in place, so recording a call is a few list stores.
+
+    **Attributes**
+        names: *list[str]*
+            Name of every kind of call, by id
+        ids: *dict[str, int]*
+            Id of every name
+        calls: *list[int]*
+            Name id of the calls in the ring buffer
+        starts: *list[int]*
+            Start of the calls, in nanoseconds
+        durations: *list[int]*
+            Duration of the calls, in nanoseconds
+        count: *int*
+            Number of calls recorded since the start, the next one goes at count % capacity
+        frame_times: *list[float]*
+            Work time of the last frames, in milliseconds, waiting for input left out
+        frame_count: *int*
+            Number of frames recorded since the start
+        frame_start: *int*
+            Start of the current frame, in nanoseconds, None between frames
+    """
+
+    def __init__(self, capacity=CAPACITY, frames=FRAMES):
+        """
+        Profiler initialization.
+
+        **Parameters**
+            capacity: *int*
+                Calls kept in the ring buffer
+            frames: *int*
+                Frames kept for the percentiles
+        """
+        self.capacity = capacity
+        self.names = []
+        self.ids = {}
+        self.calls = [0] * capacity
+        self.starts = [0] * capacity
+        self.durations = [0] * capacity
+        self.count = 0
+        self.frame_times = [0.0] * frames
+        self.frame_count = 0
+        self.frame_start = None
+        self.origin = perf_counter_ns()
+
+    def name_id(self, name):
+        """
+        Gives the id of a name, adding it on first use.
+
+        **Parameters**
+            name: *str*
+                Name of a kind of call
+
+        **Returns**
+            *int*
+                Its id
+        """
+        if name not in self.ids:
+            self.ids[name] = len(self.names)
+            self.names.append(name)
+        return self.ids[name]
+
+    def record(self, call, start, duration):
+        """
+        Puts one call in the ring buffer.
+
+        **Parameters**
+            call: *int*
+                Name id of the call
+            start: *int*
+                Start of the call, in nanoseconds
+            duration: *int*
+                Duration of the call, in nanoseconds
+        """
+        i = self.count % self.capacity
+        self.calls[i] = call
+        self.starts[i] = start
+        self.durations[i] = duration
+        self.count += 1
+
+    def timed(self, name, function):
+        """
+        Wraps a function so that every call to it is recorded.
+
+        **Parameters**
+            name: *str*
+                Name the calls are recorded under
+            function: *callable*
+                The function
+
+        **Returns**
+            *callable*
+                The wrapped function
+        """
+        call = self.name_id(name)
+        record = self.record
+
+        def wrapper(*args, **kwargs):
+            start = perf_counter_ns()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(call, start, perf_counter_ns() - start)
+
+        wrapper.__wrapped__ = function
+        return wrapper
+
+    def attach(self, obj, methods):
+        """
+        Times some methods of one object, by shadowing them with timed wrappers on the object.
+        Methods already timed, and methods the object does not have, are left out.
+
+        **Parameters**
+            obj: *object*
+                The object, such as the game or its board
+            methods: *list[str]*
+                Names of the methods
+        """
+        owner = type(obj).__name__
+        for method in methods:
+            if method not in vars(obj) and hasattr(obj, method):
+                setattr(obj, method, self.timed(f"{owner}.{method}", getattr(obj, method)))
+
+    @staticmethod
+    def detach(obj, methods):
+        """
+        Stops timing some methods of an object, removing the wrappers attach put on it.
+
+        **Parameters**
+            obj: *object*
+                The object
+            methods: *list[str]*
+                Names of the methods
+        """
+        for method in methods:
+            vars(obj).pop(method, None)
+
+    def begin_frame(self):
+        """
+        Marks the start of the work of a frame, right after the game stops waiting for input.
+        """
+        self.frame_start = perf_counter_ns()
+
+    def end_frame(self):
+        """
+        Marks the end of the work of a frame, right before the game waits for input again.
+        """
+        if self.frame_start is None:
+            return
+        end = perf_counter_ns()
+        self.record(self.name_id("frame"), self.frame_start, end - self.frame_start)
+        self.frame_times[self.frame_count % len(self.frame_times)] = (end - self.frame_start) / 1e6
+        self.frame_count += 1
+        self.frame_start = None
+
+    def percentiles(self, q=(50, 95, 99, 100)):
+        """
+        Computes percentiles of the frame times kept.
+
+        **Parameters**
+            q: *tuple[float]*
+                The percentiles, 100 for the slowest frame
+
+        **Returns**
+            *numpy.ndarray[float]*
+                The frame times in milliseconds, NaN before the first frame
+        """
+        if not self.frame_count:
+            return np.full(len(q), np.nan)
+        return np.percentile(self.frame_times[:min(self.frame_count, len(self.frame_times))], q)
+
+    def summary(self):
+        """
+        Gives the frame time percentiles as one line of text for the overlay.
+
+        **Returns**
+            *str*
+                The text, in milliseconds
+        """
+        p50, p95, p99, worst = self.percentiles()
+        return f"p50 {p50:.1f} p95 {p95:.1f} p99 {p99:.1f} max {worst:.1f} ms"
+
+    def trace_events(self):
+        """
+        Lists the calls in the ring buffer as Chrome trace events, oldest first.
+
+        **Returns**
+            *list[dict]*
+                One complete ("X") event per call, times in microseconds
+        """
+        kept = min(self.count, self.capacity)
+        first = self.count - kept
+        pid = os.getpid()
+        events = []
+        for n in range(first, self.count):
+            i = n % self.capacity
+            events.append({"name": self.names[self.calls[i]], "ph": "X", "pid": pid, "tid": 0,
+                           "ts": (self.starts[i] - self.origin) / 1000, "dur": self.durations[i] / 1000})
+        return events
+
+    def save(self, path):
+        """
+        Writes the calls in the ring buffer to a Chrome trace file.
+
+        **Parameters**
+            path: *str*
+                Path of the file
+        """
+        with open(path, "w") as file:
+            json.dump({"traceEvents": self.trace_events(), "displayTimeUnit": "ms"}, file)
+
+
+class LatencyTracker:
+    """
+    This class measures the time from a click to the moment the tiles it changed are on the display,
+    and keeps a histogram of it for every kind of action.
+
+    **Attributes**
+        samples: *dict[str, list[float]]*
+            Latencies of every kind of action, in milliseconds, the last max_samples of them
+        counts: *dict[str, list[int]]*
+            Histogram of every kind of action over LATENCY_BINS, the last bin counts the slower ones
+        pending: *list[tuple[str, int]]*
+            Kind and time of the clicks whose changes are not on the display yet
+        clicked: *int*
+            Time the click being handled was taken from the event queue, in nanoseconds
+        before: *tuple[int, int]*
+            Revealed tiles and flags before the click being handled
+        profiler: *Profiler*
+            Also gets every latency as a call, so it shows in the trace, None for no profiler
+    """
+
+    def __init__(self, max_samples=10000, profiler=None):
+        """
+        LatencyTracker initialization.
+
+        **Parameters**
+            max_samples: *int*
+                Latencies kept for the percentiles of each kind of action
+            profiler: *Profiler*
+                Profiler to record the latencies in as well
+        """
+        self.max_samples = max_samples
+        self.samples = {kind: [] for kind in ACTIONS}
+        self.counts = {kind: [0] * (len(LATENCY_BINS) + 1) for kind in ACTIONS}
+        self.pending = []
+        self.clicked = None
+        self.before = None
+        self.profiler = profiler
+
+    @staticmethod
+    def progress(board):
+        """
+        Counts the revealed tiles and the flags of a board, the revealed tiles up to a constant.
+
+        **Parameters**
+            board: *MineField or EndlessField*
+                The board
+
+        **Returns**
+            *tuple[int, int]*
+                The revealed tiles and the flags
+        """
+        revealed = board.revealed_count if hasattr(board, "revealed_count") else -board.safe_remaining
+        return revealed, board.flag_count
+
+    def click(self, board, clicked=None):
+        """
+        Marks the start of a click, before its action runs.
+
+        **Parameters**
+            board: *MineField or EndlessField*
+                The board the click is on
+            clicked: *int*
+                perf_counter_ns time the click was taken from the event queue, so the time
+                spent on the events before it in the same batch is counted. Default to now.
+        """
+        self.clicked = perf_counter_ns() if clicked is None else clicked
+        self.before = self.progress(board)
+
+    def action(self, board):
+        """
+        Finds what the click did once its action ran, and waits for it to be displayed.
+        Clicks that changed nothing are dropped.
+
+        **Parameters**
+            board: *MineField or EndlessField*
+                The board the click is on
+        """
+        revealed, flags = self.progress(board)
+        if board.lost:
+            kind = "loss"
+        elif flags != self.before[1]:
+            kind = "flag"
+        elif revealed - self.before[0] > 1:
+            kind = "cascade"
+        elif revealed != self.before[0]:
+            kind = "reveal"
+        else:
+            return
+        self.pending.append((kind, self.clicked))
+
+    def presented(self):
+        """
+        Records the latency of every click waiting to be displayed, right after the display was updated.
+        """
+        if not self.pending:
+            return
+        now = perf_counter_ns()
+        for kind, clicked in self.pending:
+            latency = (now - clicked) / 1e6
+            samples = self.samples[kind]
+            if len(samples) >= self.max_samples:
+                del samples[0]
+            samples.append(latency)
+            self.counts[kind][bisect.bisect_left(LATENCY_BINS, latency)] += 1
+            if self.profiler is not None:
+                self.profiler.record(self.profiler.name_id(f"latency {kind}"), clicked, now - clicked)
+        self.pending.clear()
+
+    def summary(self):
+        """
+        Gives the latency percentiles and histogram of every kind of action seen.
+
+        **Returns**
+            *dict[str, dict]*
+                For every kind of action: the number of clicks, p50, p95 and max in milliseconds,
+                and the histogram as (upper bound in ms, count) pairs, None for the last bin
+        """
+        result = {}
+        for kind in ACTIONS:
+            if not self.samples[kind]:
+                continue
+            p50, p95, worst = np.percentile(self.samples[kind], (50, 95, 100))
+            result[kind] = {"clicks": sum(self.counts[kind]), "p50": p50, "p95": p95, "max": worst,
+                            "histogram": list(zip(list(LATENCY_BINS) + [None], self.counts[kind]))}
+        return result
+
+    def report(self):
+        """
+        Formats the summary as text, one histogram per kind of action.
+
+        **Returns**
+            *str*
+                The report
+        """
+        lines = ["Click to display latency"]
+        for kind, stats in self.summary().items():
+            lines.append(f"{kind:<8} {stats['clicks']:5d} clicks  p50 {stats['p50']:6.1f}  "
+                         f"p95 {stats['p95']:6.1f}  max {stats['max']:6.1f} ms")
+            low = 0
+            for high, count in stats["histogram"]:
+                label = f"{low:>4}-{high:<4}" if high is not None else f"{low:>4}+    "
+                if count:
+                    lines.append(f"  {label} ms {count:5d} {'#' * min(50, count)}")
+                low = high
+        return "\n".join(lines)
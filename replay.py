@@ -0,0 +1,377 @@
+"""
+This code records games into a compact binary log and plays them back.
+1. A header with the board size, mine count and seed, or the mines themselves
+2. One record per action: the tile index and action type as a varint, then the
+   milliseconds since the previous action as a varint
+3. Headless playback at full speed on a MineField, or at real speed in the game
+
+Usage:
+    python replay.py game.msr
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from engine import MineField
+
+# First bytes of every replay file, then the format version
+MAGIC = b"MSR"
+VERSION = 1
+# Header flags
+HAS_SEED = 1
+HAS_MINES = 2
+# Action types, stored in the low bits of the tile index
+REVEAL, FLAG = 0, 1
+ACTION_BITS = 1
+
+
+def write_varint(buffer, value):
+    """
+    Appends a non negative integer as a varint: 7 bits per byte, low bits first,
+    the high bit set on every byte but the last.
+
+    **Parameters**
+        buffer: *bytearray*
+            The buffer to append to
+        value: *int*
+            The integer, of any size
+    """
+    while value > 0x7F:
+        buffer.append(value & 0x7F | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def read_varint(data, pos):
+    """
+    Reads one varint.
+
+    **Parameters**
+        data: *bytes*
+            The buffer to read from
+        pos: *int*
+            Position of the first byte of the varint
+
+    **Returns**
+        value: *int*
+            The integer
+        pos: *int*
+            Position right after the varint
+
+    **Raises**
+        ValueError
+            If the buffer ends inside the varint
+    """
+    value = shift = 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("Truncated replay")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            return value, pos
+
+
+def decode_varints(data):
+    """
+    Reads a run of varints all at once with NumPy, for values below 2**63.
+
+    **Parameters**
+        data: *bytes*
+            Buffer made only of whole varints
+
+    **Returns**
+        *numpy.ndarray[uint64]*
+            The integers
+
+    **Raises**
+        ValueError
+            If the buffer ends inside a varint
+    """
+    raw = np.frombuffer(data, dtype=np.uint8)
+    if raw.size and raw[-1] & 0x80:
+        raise ValueError("Truncated replay")
+    ends = np.flatnonzero(raw < 0x80)
+    if not ends.size:
+        return np.zeros(0, dtype=np.uint64)
+    starts = np.r_[0, ends[:-1] + 1]
+    # position of every byte inside its varint, which is its shift in 7 bit steps
+    position = np.arange(raw.size) - np.repeat(starts, ends - starts + 1)
+    parts = (raw & 0x7F).astype(np.uint64) << (7 * position).astype(np.uint64)
+    return np.add.reduceat(parts, starts)
+
+
+class Recorder:
+    """
+    This class records the actions of one game into the replay format.
+
+    **Attributes**
+        buffer: *bytearray*
+            The replay so far, header included
+        last_time: *int*
+            Time of the last action in milliseconds since the start of the game
+        cols: *int*
+            Number of tiles along y, to turn coordinates into tile indices
+        actions: *int*
+            Number of actions recorded
+    """
+
+    def __init__(self, rows, cols, mines, seed=None, mine_mask=None):
+        """
+        Recorder initialization, writing the header.
+        A board is replayed from its seed, as the first click places the mines the
+        same way for the same seed. Boards whose mines come from elsewhere, such as
+        the no-guess generator, store the mines themselves.
+
+        **Parameters**
+            rows: *int*
+                Number of tiles along x
+            cols: *int*
+                Number of tiles along y
+            mines: *int*
+                Number of mines
+            seed: *int or list[int]*
+                Seed of the board
+            mine_mask: *numpy.ndarray[bool]*
+                The mines of the board, when they do not come from the seed
+
+        **Raises**
+            ValueError
+                If neither the seed nor the mines are given, the game could not be replayed
+        """
+        if seed is None and mine_mask is None:
+            raise ValueError("A replay needs the seed or the mines of the board")
+        self.buffer = bytearray(MAGIC)
+        self.buffer.append(VERSION)
+        for value in (rows, cols, mines):
+            write_varint(self.buffer, value)
+        flags = (HAS_SEED if seed is not None else 0) | (HAS_MINES if mine_mask is not None else 0)
+        write_varint(self.buffer, flags)
+        if seed is not None:
+            seed = list(seed) if isinstance(seed, (list, tuple)) else [seed]
+            write_varint(self.buffer, len(seed))
+            for value in seed:
+                write_varint(self.buffer, int(value))
+        if mine_mask is not None:
+            self.buffer += np.packbits(mine_mask.ravel()).tobytes()
+        self.cols = cols
+        self.last_time = 0
+        self.actions = 0
+
+    def record(self, action, x, y, time_ms):
+        """
+        Records one action.
+
+        **Parameters**
+            action: *int*
+                REVEAL or FLAG
+            x: *int*
+                x coordinate of the tile
+            y: *int*
+                y coordinate of the tile
+            time_ms: *int*
+                Milliseconds since the start of the game
+        """
+        write_varint(self.buffer, (x * self.cols + y) << ACTION_BITS | action)
+        write_varint(self.buffer, max(0, time_ms - self.last_time))
+        self.last_time = max(self.last_time, time_ms)
+        self.actions += 1
+
+    def save(self, path):
+        """
+        Writes the replay to a file.
+
+        **Parameters**
+            path: *str*
+                Path of the file
+        """
+        with open(path, "wb") as file:
+            file.write(self.buffer)
+
+
+class Replay:
+    """
+    This class is a replay read back: the board and the list of actions.
+
+    **Attributes**
+        rows: *int*
+            Number of tiles along x
+        cols: *int*
+            Number of tiles along y
+        mines: *int*
+            Number of mines
+        seed: *list[int]*
+            Seed of the board, None if the mines are stored
+        mine_mask: *numpy.ndarray[bool]*
+            The mines of the board, None if they come from the seed
+        cells: *numpy.ndarray[int]*
+            Flat index of the tile of every action
+        kinds: *numpy.ndarray[int]*
+            Type of every action, REVEAL or FLAG
+        times: *numpy.ndarray[int]*
+            Time of every action in milliseconds since the start of the game
+    """
+
+    def __init__(self, data):
+        """
+        Reads a replay.
+
+        **Parameters**
+            data: *bytes*
+                Content of a replay file
+
+        **Raises**
+            ValueError
+                If the data is not a replay of a known version
+        """
+        if data[:len(MAGIC)] != MAGIC or len(data) <= len(MAGIC):
+            raise ValueError("Not a replay file")
+        if data[len(MAGIC)] != VERSION:
+            raise ValueError(f"Unknown replay version {data[len(MAGIC)]}")
+        pos = len(MAGIC) + 1
+        self.rows, pos = read_varint(data, pos)
+        self.cols, pos = read_varint(data, pos)
+        self.mines, pos = read_varint(data, pos)
+        flags, pos = read_varint(data, pos)
+        self.seed = None
+        if flags & HAS_SEED:
+            count, pos = read_varint(data, pos)
+            self.seed = []
+            for _ in range(count):
+                value, pos = read_varint(data, pos)
+                self.seed.append(value)
+        self.mine_mask = None
+        if flags & HAS_MINES:
+            size = (self.rows * self.cols + 7) // 8
+            bits = np.frombuffer(data, dtype=np.uint8, count=size, offset=pos)
+            self.mine_mask = np.unpackbits(bits)[:self.rows * self.cols].astype(bool).reshape(self.rows, self.cols)
+            pos += size
+        values = decode_varints(data[pos:])
+        if values.size % 2:
+            raise ValueError("Truncated replay")
+        codes = values[0::2].astype(np.int64)
+        self.cells = codes >> ACTION_BITS
+        self.kinds = codes & ((1 << ACTION_BITS) - 1)
+        self.times = np.cumsum(values[1::2].astype(np.int64))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads a replay file.
+
+        **Parameters**
+            path: *str*
+                Path of the file
+
+        **Returns**
+            *Replay*
+                The replay
+        """
+        with open(path, "rb") as file:
+            return cls(file.read())
+
+    def __len__(self):
+        return self.cells.size
+
+    def setup(self, field):
+        """
+        Gets a new board ready for the actions: places the stored mines if there are any.
+
+        **Parameters**
+            field: *MineField*
+                A new board made with the size, mine count and seed of the replay
+        """
+        if self.mine_mask is not None:
+            field.set_mines(np.flatnonzero(self.mine_mask))
+
+    def new_field(self):
+        """
+        Makes the board of the replay, ready for the actions.
+
+        **Returns**
+            *MineField*
+                The board
+        """
+        field = MineField(self.rows, self.cols, self.mines, self.seed)
+        self.setup(field)
+        return field
+
+    def apply(self, field, i):
+        """
+        Applies one action to the board, see play_action.
+
+        **Parameters**
+            field: *MineField*
+                The board
+            i: *int*
+                Index of the action
+        """
+        play_action(field, *divmod(int(self.cells[i]), self.cols), self.kinds[i] == FLAG)
+
+    def play(self, field=None):
+        """
+        Replays every action on a board at full speed, without drawing.
+
+        **Parameters**
+            field: *MineField*
+                The board, a new one is made if not given
+
+        **Returns**
+            *MineField*
+                The board after the last action
+        """
+        field = field if field is not None else self.new_field()
+        cols = self.cols
+        # the actions as Python ints, indexing the arrays one action at a time costs more than playing it
+        for cell, is_flag in zip(self.cells.tolist(), (self.kinds == FLAG).tolist()):
+            play_action(field, *divmod(cell, cols), is_flag)
+        return field
+
+
+def play_action(field, x, y, flag):
+    """
+    Plays one recorded action on a board, the way the game does:
+    the first reveal places the mines, a revealed mine ends the game and shows the mines.
+
+    **Parameters**
+        field: *MineField*
+            The board
+        x: *int*
+            x coordinate of the tile
+        y: *int*
+            y coordinate of the tile
+        flag: *bool*
+            Whether the action toggles a flag instead of revealing the tile
+    """
+    if not field.play_move(x, y, flag):
+        field.explode_mines()
+
+
+def main(argv=None):
+    """
+    Command line entry point: replays a file headless and prints the outcome.
+
+    **Parameters**
+        argv: *list[str]*
+            Command line arguments, default to sys.argv
+    """
+    parser = argparse.ArgumentParser(description="Replay a recorded Minesweeper game without a window.")
+    parser.add_argument("path", help="replay file")
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+    replay = Replay.load(args.path)
+    field = replay.play()
+    elapsed = time.perf_counter() - start
+    outcome = "won" if field.won else ("lost" if field.lost else "unfinished")
+    print(f"{replay.rows}x{replay.cols} board, {replay.mines} mines, {len(replay)} actions over "
+          f"{int(replay.times[-1]) / 1000 if len(replay) else 0:.1f} s: {outcome}")
+    print(f"replayed in {elapsed * 1000:.1f} ms ({len(replay) / elapsed:.0f} actions/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,380 @@
+"""
+This code saves and loads games in a versioned binary format.
+1. A fixed size header: board size, counters, clock, and the seed and settings as JSON
+2. One bit plane per board state (mines, revealed, flagged, ...), each row starting on a byte
+3. The file is opened through mmap: a resumed board reads its planes in bands of rows,
+   the first time the view or a cascade reaches them, and a save only rewrites the rows
+   that changed since the last one
+
+Layout of a file:
+    HEADER_SIZE bytes of header, then the planes in PLANES order, each rows * row_bytes bytes
+"""
+
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from engine import box_sum
+
+# First bytes of every save file, then the format version
+MAGIC = b"MSSV"
+VERSION = 1
+# The header takes this many bytes, the planes start right after
+HEADER_SIZE = 4096
+# magic, version, number of planes, rows, cols, num_mine, state bits, planes that may hold a set bit,
+# elapsed milliseconds, flag_count, safe_remaining, length of the JSON settings
+HEADER = struct.Struct("<4sHHIIIIIQQQI")
+# Board arrays saved as bit planes, in file order
+PLANES = ("mine", "revealed", "flagged", "exploded", "wrong_flag")
+# State bits
+MINES_PLACED, LOST = 1, 2
+# Rows read at once into a resumed board
+BAND_ROWS = 64
+
+
+class SaveFile:
+    """
+    This class is an open save file, mapped in memory.
+    Opening it only reads the header; a board loaded from it reads the planes one band
+    of rows at a time when it first needs them, and planes known to be empty are never read.
+
+    **Attributes**
+        path: *str*
+            Path of the file
+        rows: *int*
+            Number of tiles along x
+        cols: *int*
+            Number of tiles along y
+        num_mine: *int*
+            Number of mines
+        state: *int*
+            MINES_PLACED and LOST bits
+        nonempty: *int*
+            Bit i is set if plane i may hold a set bit
+        elapsed_ms: *int*
+            Time played, in milliseconds
+        flag_count: *int*
+            Number of flagged tiles
+        safe_remaining: *int*
+            Number of tiles without a mine left to reveal
+        settings: *dict*
+            The seed and any other setting saved with the game
+        row_bytes: *int*
+            Bytes of one row of a plane
+        field: *MineField*
+            The board loaded from the file, None before load_into
+        loaded: *numpy.ndarray[bool]*
+            Whether each band of BAND_ROWS rows was read into the board
+    """
+
+    def __init__(self, path, writable=False):
+        """
+        Opens a save file and reads its header.
+
+        **Parameters**
+            path: *str*
+                Path of the file
+            writable: *bool*
+                Whether the file is opened to be updated
+
+        **Raises**
+            ValueError
+                If the file is not a save file of a known version
+        """
+        self.path = path
+        self.field = None
+        self.loaded = None
+        self.file = open(path, "r+b" if writable else "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        if len(self.map) < HEADER_SIZE or self.map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a save file")
+        (_, version, planes, self.rows, self.cols, self.num_mine, self.state, self.nonempty,
+         self.elapsed_ms, self.flag_count, self.safe_remaining, settings_size) = HEADER.unpack_from(self.map)
+        if version != VERSION or planes != len(PLANES):
+            self.close()
+            raise ValueError(f"Unknown save file version {version}")
+        self.settings = json.loads(self.map[HEADER.size:HEADER.size + settings_size].decode())
+        self.row_bytes = (self.cols + 7) // 8
+        if len(self.map) < HEADER_SIZE + len(PLANES) * self.rows * self.row_bytes:
+            self.close()
+            raise ValueError(f"{path} is truncated")
+
+    @classmethod
+    def create(cls, path, field, elapsed_ms=0, settings=None):
+        """
+        Writes a whole board to a new save file, and opens it for later updates.
+
+        **Parameters**
+            path: *str*
+                Path of the file
+            field: *MineField*
+                The board
+            elapsed_ms: *int*
+                Time played, in milliseconds
+            settings: *dict*
+                Settings to keep with the game, the seed of the board is added to them
+
+        **Returns**
+            *SaveFile*
+                The open file
+        """
+        field.need_rows(0, field.rows)
+        row_bytes = (field.cols + 7) // 8
+        size = HEADER_SIZE + len(PLANES) * field.rows * row_bytes
+        nonempty = sum(1 << i for i, name in enumerate(PLANES) if getattr(field, name).any())
+        # Write next to the final file first so a half written save never replaces a good one
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as file:
+            # the file starts out zero filled, so empty planes are not written at all
+            file.truncate(size)
+        with open(tmp_path, "r+b") as file, mmap.mmap(file.fileno(), size) as data:
+            write_header(data, field, elapsed_ms, settings, nonempty)
+            for i, name in enumerate(PLANES):
+                if nonempty >> i & 1:
+                    plane = np.frombuffer(data, dtype=np.uint8, count=field.rows * row_bytes,
+                                          offset=HEADER_SIZE + i * field.rows * row_bytes)
+                    plane[...] = np.packbits(getattr(field, name), axis=1).ravel()
+                    del plane
+            data.flush()
+        os.replace(tmp_path, path)
+        return cls(path, writable=True)
+
+    def plane(self, name):
+        """
+        Gives a plane as packed bytes, straight on the mapped file without reading it.
+
+        **Parameters**
+            name: *str*
+                One of PLANES
+
+        **Returns**
+            *numpy.ndarray[uint8]*
+                The packed plane, one row of row_bytes bytes per x
+        """
+        i = PLANES.index(name)
+        size = self.rows * self.row_bytes
+        return np.frombuffer(self.map, dtype=np.uint8, count=size,
+                             offset=HEADER_SIZE + i * size).reshape(self.rows, self.row_bytes)
+
+    def unpack(self, name, x0=0, x1=None):
+        """
+        Reads some rows of a plane. Only the pages of the file holding them are read.
+
+        **Parameters**
+            name: *str*
+                One of PLANES
+            x0: *int*
+                First row
+            x1: *int*
+                Row after the last one, default to the end of the board
+
+        **Returns**
+            *numpy.ndarray[bool]*
+                The tiles of rows x0 to x1
+        """
+        x1 = self.rows if x1 is None else x1
+        if not self.nonempty >> PLANES.index(name) & 1:
+            return np.zeros((x1 - x0, self.cols), dtype=bool)
+        return np.unpackbits(self.plane(name)[x0:x1], axis=1, count=self.cols).astype(bool)
+
+    def load_into(self, field):
+        """
+        Resumes the saved game on a new board of the same size. Only the counters of the
+        header are read now: the board gets this file as its source, and reads the rows of
+        its planes through load_rows when it first needs them, so resuming does not depend
+        on the size of the board. The file must stay open while the board reads from it.
+
+        **Parameters**
+            field: *MineField*
+                The board, as made with the rows, cols, num_mine and seed of the file
+
+        **Raises**
+            ValueError
+                If the board does not have the size of the save
+        """
+        if (field.rows, field.cols) != (self.rows, self.cols):
+            raise ValueError(f"Saved board is {self.rows}x{self.cols}, not {field.rows}x{field.cols}")
+        field.num_mine = self.num_mine
+        field.flag_count = self.flag_count
+        field.safe_remaining = self.safe_remaining
+        field.lost = bool(self.state & LOST)
+        field.mines_placed = bool(self.state & MINES_PLACED)
+        field.candidate = False
+        field.source = self
+        self.field = field
+        self.loaded = np.zeros(-(-self.rows // BAND_ROWS), dtype=bool)
+
+    def load_rows(self, field, x0, x1):
+        """
+        Reads the bands of rows x0 to x1 not read yet into the board, with their numbers.
+        The board stops reading from the file once every band is in.
+
+        **Parameters**
+            field: *MineField*
+                The board loaded from this file
+            x0: *int*
+                First row
+            x1: *int*
+                Row after the last one
+
+        **Returns**
+            *list[tuple[int, int]]*
+                First and end row of every band read
+        """
+        if x1 <= x0:
+            return []
+        first = x0 // BAND_ROWS
+        bands = []
+        for band in (np.flatnonzero(~self.loaded[first:(x1 - 1) // BAND_ROWS + 1]) + first).tolist():
+            a, b = band * BAND_ROWS, min((band + 1) * BAND_ROWS, self.rows)
+            for i, name in enumerate(PLANES):
+                if self.nonempty >> i & 1:
+                    getattr(field, name)[a:b] = self.unpack(name, a, b)
+            if self.state & MINES_PLACED:
+                field.adjacent[a:b] = self.numbers(a, b)
+            self.loaded[band] = True
+            bands.append((a, b))
+        if self.loaded.all():
+            field.source = None
+        return bands
+
+    def numbers(self, x0, x1):
+        """
+        Counts the numbers of some rows from the saved mines, with the rows around them.
+
+        **Parameters**
+            x0: *int*
+                First row
+            x1: *int*
+                Row after the last one
+
+        **Returns**
+            *numpy.ndarray[uint8]*
+                The numbers of rows x0 to x1, 0 on the mines
+        """
+        # the mines of the rows with a one tile border, left empty past the edges of the board
+        window = np.zeros((x1 - x0 + 2, self.cols + 2), dtype=np.uint8)
+        xa, xb = max(x0 - 1, 0), min(x1 + 1, self.rows)
+        window[xa - x0 + 1:xb - x0 + 1, 1:-1] = self.unpack("mine", xa, xb)
+        return box_sum(window)
+
+    def update(self, field, rows=None, elapsed_ms=0, settings=None):
+        """
+        Saves the board again, rewriting only the given rows of every plane and the header,
+        so the cost follows the number of changed rows and not the size of the board.
+
+        **Parameters**
+            field: *MineField*
+                The board, of the size of the save
+            rows: *numpy.ndarray[int]*
+                x of the rows changed since the last save, every row if not given
+            elapsed_ms: *int*
+                Time played, in milliseconds
+            settings: *dict*
+                Settings to keep with the game
+        """
+        if rows is None:
+            field.need_rows(0, field.rows)
+        rows = np.arange(self.rows) if rows is None else np.unique(np.asarray(rows, dtype=np.intp))
+        if not rows.size:
+            self.write_header(field, elapsed_ms, settings)
+            self.flush(0, HEADER_SIZE)
+            return
+        size = self.rows * self.row_bytes
+        for i, name in enumerate(PLANES):
+            values = getattr(field, name)[rows]
+            if not values.any() and not self.nonempty >> i & 1:
+                continue
+            self.nonempty |= 1 << i
+            plane = self.plane(name)
+            plane[rows] = np.packbits(values, axis=1)
+            del plane
+            start = HEADER_SIZE + i * size
+            self.flush(start + int(rows[0]) * self.row_bytes, start + (int(rows[-1]) + 1) * self.row_bytes)
+        self.write_header(field, elapsed_ms, settings)
+        self.flush(0, HEADER_SIZE)
+
+    def flush(self, start, end):
+        """
+        Writes a range of the mapped file to disk, widened to whole pages.
+
+        **Parameters**
+            start: *int*
+                First byte of the range
+            end: *int*
+                Byte after the last one
+        """
+        start -= start % mmap.ALLOCATIONGRANULARITY
+        self.map.flush(start, end - start)
+
+    def write_header(self, field, elapsed_ms, settings):
+        """
+        Rewrites the header in place.
+
+        **Parameters**
+            field: *MineField*
+                The board
+            elapsed_ms: *int*
+                Time played, in milliseconds
+            settings: *dict*
+                Settings to keep with the game
+        """
+        self.settings = write_header(self.map, field, elapsed_ms, settings, self.nonempty)
+        self.elapsed_ms = elapsed_ms
+        self.flag_count = field.flag_count
+        self.safe_remaining = field.safe_remaining
+
+    def close(self):
+        """
+        Closes the mapping and the file. A board still reading from the file reads the rest of it first.
+        """
+        if self.field is not None and self.field.source is self:
+            self.field.need_rows(0, self.rows)
+        self.field = None
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_header(data, field, elapsed_ms, settings, nonempty):
+    """
+    Writes the header of a save into a buffer.
+
+    **Parameters**
+        data: *mmap.mmap*
+            The mapped file
+        field: *MineField*
+            The board
+        elapsed_ms: *int*
+            Time played, in milliseconds
+        settings: *dict*
+            Settings to keep with the game
+        nonempty: *int*
+            Bit i is set if plane i may hold a set bit
+
+    **Returns**
+        settings: *dict*
+            The settings written, with the seed of the board
+
+    **Raises**
+        ValueError
+            If the settings do not fit in the header
+    """
+    settings = dict(settings or {}, seed=field.seed)
+    text = json.dumps(settings).encode()
+    if HEADER.size + len(text) > HEADER_SIZE:
+        raise ValueError("Settings too large for the save file header")
+    state = (MINES_PLACED if field.mines_placed else 0) | (LOST if field.lost else 0)
+    HEADER.pack_into(data, 0, MAGIC, VERSION, len(PLANES), field.rows, field.cols, field.num_mine, state,
+                     nonempty, int(elapsed_ms), field.flag_count, field.safe_remaining, len(text))
+    data[HEADER.size:HEADER.size + len(text)] = text
+    return settings
@@ -2,12 +2,9 @@
 This code is for game settings.
 1. Color settings
 2. Game default values settings
-3. Import tiles
+3. Tile images, loaded lazily by the assets module
 """
 
-import pygame
-import os
-
 # Color settings
 white = (255, 255, 255)
 bg_color = (40, 40, 40)
@@ -19,33 +16,40 @@ default_col = 15
 num_mine = 20
 default_width = tile_size * default_row
 default_height = tile_size * default_col
+# Largest window, bigger boards are scrolled
+max_width = 1280
+max_height = 800
 FPS = 60
+show_fps = False  # FPS readout on the HUD, toggled with the F key
 title = "Minesweeper Game"
 
-# Import all the tiles from the assets folder
-# Tile type - numbers
-tile_list = []
-filename = "assets"
-for i in range(1, 9):  # since mine number is up to 8
-    # resize tile img we have to fit the tile size in our game which is a square
-    tile_list.append(pygame.transform.scale
-                     (pygame.image.load(os.path.join(filename, f"Tile{i}.png")),
-                      (tile_size, tile_size)))
-# Tile type - background tile
-tile_blank = (pygame.transform.scale
-              (pygame.image.load(os.path.join(filename, "TileEmpty.png")), (tile_size, tile_size)))
-# Tile type - mine that explodes due to missclick
-tile_mine_explode = (pygame.transform.scale
-                     (pygame.image.load(os.path.join(filename, "TileExploded.png")), (tile_size, tile_size)))
-# Tile type - user flags the tile indicating a mine under
-tile_flag = (pygame.transform.scale
-             (pygame.image.load(os.path.join("assets", "TileFlag.png")), (tile_size, tile_size)))
-# Tile type - mine tile
-tile_mine = (pygame.transform.scale
-             (pygame.image.load(os.path.join("assets", "TileMine.png")), (tile_size, tile_size)))
-# Tile type - blank or unclicked tiles
-tile_unknown = (pygame.transform.scale
-                (pygame.image.load(os.path.join("assets", "TileUnknown.png")), (tile_size, tile_size)))
-# Tile type - this means users mis-flags the tile, there's actually no mine under
-tile_mine_wrong = (pygame.transform.scale
-                   (pygame.image.load(os.path.join("assets", "TileNotMine.png")), (tile_size, tile_size)))
+# Tiles are loaded lazily from the assets folder by the asset manager.
+# The old module level names below still work, they are looked up on first access.
+lazy_tiles = {
+    "tile_blank": "TileEmpty",  # Tile type - background tile
+    "tile_mine_explode": "TileExploded",  # Tile type - mine that explodes due to missclick
+    "tile_flag": "TileFlag",  # Tile type - user flags the tile indicating a mine under
+    "tile_mine": "TileMine",  # Tile type - mine tile
+    "tile_unknown": "TileUnknown",  # Tile type - blank or unclicked tiles
+    "tile_mine_wrong": "TileNotMine",  # Tile type - this means users mis-flags the tile, there's actually no mine under
+}
+
+
+def __getattr__(name):
+    """
+    Loads the tile images the first time one of them is used.
+
+    **Parameters**
+        name: *str*
+            Name of the module attribute
+
+    **Returns**
+        *pygame.Surface* or *list[pygame.Surface]*
+            The tile image, or the list of number tiles for "tile_list"
+    """
+    import assets
+    if name == "tile_list":  # Tile type - numbers, since mine number is up to 8
+        return [assets.manager.tile(f"Tile{i}", tile_size) for i in range(1, 9)]
+    if name in lazy_tiles:
+        return assets.manager.tile(lazy_tiles[name], tile_size)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
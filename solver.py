@@ -0,0 +1,372 @@
+"""
+This code deduces safe tiles and mines from the clues of a Minesweeper board.
+1. Single clue rule: a clue whose mines are all found frees the rest of its tiles,
+   a clue with as many unknown tiles as missing mines makes them all mines
+2. Pairwise rule: two clues sharing tiles, such as one clue whose tiles are a subset of another's
+3. Incremental work: only the clues around tiles whose state changed are evaluated again
+
+The solver only reads what a player sees: the revealed clues and the flags.
+"""
+
+import weakref
+from collections import deque
+
+import numpy as np
+
+from engine import NEIGHBOR_OFFSETS
+
+# Status of a tile for the solver
+UNKNOWN, CLUE, MINE, SAFE, BORDER = range(5)
+# Width of the border around the board, clues two tiles apart can share tiles
+PAD = 2
+
+
+class Solver:
+    """
+    This class keeps what can be deduced about a MineField from its revealed clues.
+    Tiles are kept in flat indices of the board padded with a border of PAD tiles,
+    so the neighbors of a tile, and the clues two tiles away, are fixed offsets of its index.
+
+    **Attributes**
+        field: *MineField*
+            The board being solved
+        trust_flags: *bool*
+            Whether the flags of the player count as mines. A wrong flag then leads
+            to wrong deductions, as it would for the player.
+        width: *int*
+            Number of padded tiles along y
+        status: *bytearray*
+            Status of every padded tile: UNKNOWN, CLUE, MINE, SAFE or BORDER
+        clue: *bytearray*
+            Number of every revealed tile
+        safe: *set[int]*
+            Padded indices of the tiles deduced safe and not revealed yet
+        mines: *set[int]*
+            Padded indices of the tiles deduced to be mines
+    """
+
+    def __init__(self, field, trust_flags=True):
+        """
+        Solver initialization, reading the clues already revealed.
+
+        **Parameters**
+            field: *MineField*
+                The board to solve
+            trust_flags: *bool*
+                Whether the flags of the player count as mines
+        """
+        self.field = field
+        self.trust_flags = trust_flags
+        self.width = field.cols + 2 * PAD
+        status = np.full((field.rows + 2 * PAD, self.width), BORDER, dtype=np.uint8)
+        status[PAD:-PAD, PAD:-PAD] = UNKNOWN
+        self.status = bytearray(status.tobytes())
+        self.clue = bytearray(status.size)
+        self.offsets = [dx * self.width + dy for dx, dy in NEIGHBOR_OFFSETS]
+        # Clues within two tiles can share unknown tiles
+        self.pair_offsets = [dx * self.width + dy for dx in range(-2, 3) for dy in range(-2, 3) if dx or dy]
+        self.safe = set()
+        self.mines = set()
+        self.flags = set()
+        self.queue = deque()
+        self.queued = bytearray(status.size)
+        self.update()
+
+    def to_padded(self, flat):
+        """
+        Converts flat indices of the board to padded indices.
+
+        **Parameters**
+            flat: *numpy.ndarray[int]*
+                Flat indices x * cols + y
+
+        **Returns**
+            *numpy.ndarray[int]*
+                Padded indices (x + PAD) * width + y + PAD
+        """
+        x, y = np.divmod(flat, self.field.cols)
+        return (x + PAD) * self.width + y + PAD
+
+    def to_tile(self, p):
+        """
+        Converts a padded index to the coordinates of the tile.
+
+        **Parameters**
+            p: *int*
+                Padded index
+
+        **Returns**
+            *tuple[int, int]*
+                x and y of the tile
+        """
+        x, y = divmod(p, self.width)
+        return x - PAD, y - PAD
+
+    def board_status(self):
+        """
+        Gives the status of the tiles of the board, without the border.
+
+        **Returns**
+            *numpy.ndarray[uint8]*
+                A view of the status, indexed by [x, y]
+        """
+        status = np.frombuffer(self.status, dtype=np.uint8).reshape(-1, self.width)
+        return status[PAD:-PAD, PAD:-PAD]
+
+    def update(self, cells=None):
+        """
+        Takes in tiles that were revealed or flagged since the last update and
+        deduces what follows from them.
+
+        **Parameters**
+            cells: *numpy.ndarray[int]*
+                Flat indices of the tiles revealed since the last update, as returned by
+                MineField.reveal. If not given they are found by comparing the whole board,
+                which also picks up flags placed or removed.
+        """
+        field = self.field
+        if cells is None:
+            cells = np.flatnonzero(field.revealed & (self.board_status() != CLUE))
+            if self.trust_flags:
+                flags = set(self.to_padded(np.flatnonzero(field.flagged)).tolist())
+                for p in flags - self.flags:
+                    self.set_mine(p)
+                for p in self.flags - flags:
+                    if p not in self.mines and self.status[p] == MINE:
+                        self.status[p] = UNKNOWN
+                        self.enqueue_around(p)
+                self.flags = flags
+        cells = np.asarray(cells, dtype=np.intp)
+        numbers = field.adjacent.ravel()[cells].tolist()
+        lost = field.mine.ravel()[cells].tolist()
+        status, clue = self.status, self.clue
+        for p, number, is_mine in zip(self.to_padded(cells).tolist(), numbers, lost):
+            if status[p] == CLUE:
+                continue
+            self.safe.discard(p)
+            if is_mine:
+                # a mine uncovered by losing tells nothing more than a flag
+                self.set_mine(p)
+                continue
+            status[p] = CLUE
+            clue[p] = number
+            self.enqueue(p)
+            self.enqueue_around(p)
+        self.propagate()
+
+    def enqueue(self, p):
+        """
+        Queues a clue to be evaluated again.
+
+        **Parameters**
+            p: *int*
+                Padded index of the clue
+        """
+        if not self.queued[p]:
+            self.queued[p] = 1
+            self.queue.append(p)
+
+    def enqueue_around(self, p):
+        """
+        Queues the clues around a tile whose state changed.
+
+        **Parameters**
+            p: *int*
+                Padded index of the tile
+        """
+        status = self.status
+        for offset in self.offsets:
+            q = p + offset
+            if status[q] == CLUE:
+                self.enqueue(q)
+
+    def set_safe(self, p):
+        """
+        Records a tile deduced safe.
+
+        **Parameters**
+            p: *int*
+                Padded index of the tile
+        """
+        if self.status[p] == UNKNOWN:
+            self.status[p] = SAFE
+            self.safe.add(p)
+            self.enqueue_around(p)
+
+    def set_mine(self, p):
+        """
+        Records a tile that is a mine.
+
+        **Parameters**
+            p: *int*
+                Padded index of the tile
+        """
+        if self.status[p] in (UNKNOWN, SAFE):
+            self.status[p] = MINE
+            self.safe.discard(p)
+            self.enqueue_around(p)
+
+    def constraint(self, p):
+        """
+        Gives what a clue still says about its unknown tiles.
+
+        **Parameters**
+            p: *int*
+                Padded index of the clue
+
+        **Returns**
+            unknown: *list[int]*
+                Padded indices of the unknown tiles around the clue
+            missing: *int*
+                Number of mines among them
+        """
+        status = self.status
+        unknown = []
+        missing = self.clue[p]
+        for offset in self.offsets:
+            q = p + offset
+            s = status[q]
+            if s == UNKNOWN:
+                unknown.append(q)
+            elif s == MINE:
+                missing -= 1
+        return unknown, missing
+
+    def propagate(self):
+        """
+        Evaluates the queued clues until no new safe tile or mine can be deduced.
+        A deduction queues the clues around the tiles it settled, so the work done
+        follows the changes and never scans the whole board.
+        """
+        status, queue, queued = self.status, self.queue, self.queued
+        while queue:
+            p = queue.popleft()
+            queued[p] = 0
+            unknown, missing = self.constraint(p)
+            if not unknown:
+                continue
+            if missing == 0:
+                for q in unknown:
+                    self.set_safe(q)
+                continue
+            if missing == len(unknown):
+                for q in unknown:
+                    self.mine_deduced(q)
+                continue
+            unknown = set(unknown)
+            for offset in self.pair_offsets:
+                b = p + offset
+                if status[b] != CLUE:
+                    continue
+                other, other_missing = self.constraint(b)
+                if unknown.isdisjoint(other):
+                    continue
+                other = set(other)
+                only_here = unknown - other
+                only_there = other - unknown
+                if not (only_here or only_there):
+                    continue
+                # The shared tiles hold at least missing - len(only_here) mines and at most
+                # other_missing, and the same from the other side
+                if missing - len(only_here) == other_missing:
+                    for q in only_here:
+                        self.mine_deduced(q)
+                    for q in only_there:
+                        self.set_safe(q)
+                elif other_missing - len(only_there) == missing:
+                    for q in only_there:
+                        self.mine_deduced(q)
+                    for q in only_here:
+                        self.set_safe(q)
+                else:
+                    continue
+                # this clue changed, it is evaluated again from its new state
+                self.enqueue(p)
+                break
+
+    def mine_deduced(self, p):
+        """
+        Records a tile deduced to be a mine.
+
+        **Parameters**
+            p: *int*
+                Padded index of the tile
+        """
+        if self.status[p] == UNKNOWN:
+            self.mines.add(p)
+            self.set_mine(p)
+
+    def safe_moves(self):
+        """
+        Gives the tiles known to be safe that are not revealed yet.
+
+        **Returns**
+            *list[tuple[int, int]]*
+                Coordinates of the tiles
+        """
+        return [self.to_tile(p) for p in sorted(self.safe)]
+
+    def certain_mines(self):
+        """
+        Gives the tiles deduced to be mines, whether flagged or not.
+
+        **Returns**
+            *list[tuple[int, int]]*
+                Coordinates of the tiles
+        """
+        return [self.to_tile(p) for p in sorted(self.mines)]
+
+    def solve(self):
+        """
+        Plays the board by logic alone: uncovers every safe tile until none is left.
+        The mines must already be placed. Flagged tiles are left alone, even when
+        deduced safe, so the solver stops once only those are left.
+
+        **Returns**
+            *bool*
+                True if the board is won
+        """
+        field = self.field
+        while self.safe and not field.lost:
+            # uncover all the safe tiles known so far, then deduce from all of them at once
+            tiles = [self.to_tile(p) for p in list(self.safe)]
+            changed = [field.reveal(x, y) for x, y in tiles if not field.flagged[x, y]]
+            changed = np.concatenate(changed) if changed else np.empty(0, dtype=np.intp)
+            if not changed.size:
+                # nothing left to uncover: the safe tiles are all flagged
+                break
+            self.update(changed)
+        return field.won
+
+
+# Solvers of the boards played by solver_policy, dropped with their board
+_solvers = weakref.WeakKeyDictionary()
+
+
+def solver_policy(field, rng):
+    """
+    A player for batch.py that uncovers tiles deduced safe, and otherwise guesses
+    among the tiles not known to be mines. The first move is in the middle of the board.
+
+    **Parameters**
+        field: *MineField*
+            The board being played
+        rng: *numpy.random.Generator*
+            Random generator of the player
+
+    **Returns**
+        *tuple[str, int, int]*
+            The move: "reveal" and the coordinates of the tile
+    """
+    if not field.mines_placed:
+        return "reveal", field.rows // 2, field.cols // 2
+    solver = _solvers.get(field)
+    if solver is None:
+        solver = _solvers[field] = Solver(field, trust_flags=False)
+    else:
+        solver.update()
+    if solver.safe:
+        return ("reveal",) + solver.to_tile(min(solver.safe))
+    unknown = np.flatnonzero(solver.board_status() == UNKNOWN)
+    x, y = divmod(int(unknown[rng.integers(unknown.size)]), field.cols)
+    return "reveal", x, y
@@ -0,0 +1,57 @@
+"""
+Shared setup of the tests: the modules are imported from the root of the repository,
+pygame draws without a window, and small boards are checked against brute force.
+"""
+
+import itertools
+import os
+import sys
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+
+from engine import MineField
+
+
+@pytest.fixture
+def partly_played():
+    """
+    Makes small boards played part way, with a few safe tiles revealed after the first click.
+    """
+    def play(seed, rows=4, cols=5, mines=4, reveals=2):
+        field = MineField(rows, cols, mines, seed)
+        rng = np.random.default_rng(seed)
+        field.play_move(int(rng.integers(rows)), int(rng.integers(cols)))
+        for _ in range(reveals):
+            hidden = np.flatnonzero((~field.mine & ~field.revealed).ravel())
+            if not hidden.size:
+                break
+            field.play_move(*divmod(int(rng.choice(hidden)), cols))
+        return field
+    return play
+
+
+@pytest.fixture
+def mine_layouts():
+    """
+    Lists by brute force every layout of the mines that agrees with the revealed clues of a board.
+    """
+    def layouts(field):
+        hidden = np.flatnonzero(~field.revealed.ravel())
+        clues = field.revealed
+        found = []
+        for picks in itertools.combinations(hidden.tolist(), field.num_mine):
+            mine = np.zeros(field.rows * field.cols, dtype=bool)
+            mine[list(picks)] = True
+            mine = mine.reshape(field.rows, field.cols)
+            padded = np.pad(mine, 1).astype(int)
+            around = sum(padded[1 + dx:1 + dx + field.rows, 1 + dy:1 + dy + field.cols]
+                         for dx in range(-1, 2) for dy in range(-1, 2) if dx or dy)
+            if np.array_equal(around[clues], field.adjacent[clues]):
+                found.append(mine)
+        return np.array(found)
+    return layouts
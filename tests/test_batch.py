@@ -0,0 +1,40 @@
+"""
+Tests of the batch helpers shared by batch.py and render.py.
+"""
+
+import numpy as np
+import pytest
+
+from batch import plan_batch, play_policy, random_policy
+from engine import MineField
+
+
+def test_play_policy_stops_after_max_moves():
+    field = MineField(9, 9, 10, seed=0)
+    calls = []
+
+    def flagger(field, rng):
+        # toggles the same flag again and again, the game never ends by itself
+        calls.append(1)
+        return "flag", 0, 0
+
+    assert play_policy(field, flagger, np.random.default_rng(0), 5) == 5
+    assert len(calls) == 5
+    assert field.flagged[0, 0] and not (field.won or field.lost)
+
+
+def test_play_policy_plays_to_the_end():
+    field = MineField(9, 9, 10, seed=1)
+    moves = play_policy(field, random_policy, np.random.default_rng(1), 81)
+    assert field.won or field.lost
+    assert 1 <= moves <= 81
+
+
+def test_plan_batch():
+    assert plan_batch(100, "random", workers=2) == (2, 12)
+    assert plan_batch(100000, "random", workers=2) == (2, 1000)
+    assert plan_batch(100000, "random", workers=2, largest=256) == (2, 256)
+    assert plan_batch(3, "solver", workers=8) == (8, 1)
+    assert plan_batch(100, "random", workers=2, group_size=7) == (2, 7)
+    with pytest.raises(ValueError):
+        plan_batch(100, "nope", workers=2)
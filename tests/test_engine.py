@@ -0,0 +1,64 @@
+"""
+Tests of the engine: a blank cascade reveals the same region as a plain flood fill,
+and the first click moves the mines out of its safe zone.
+"""
+
+import numpy as np
+import pytest
+
+from engine import NEIGHBOR_OFFSETS, MineField
+
+
+def flood_fill(field, x, y):
+    """
+    Reveals the region of a blank tile one tile at a time, on a copy of the revealed tiles.
+    """
+    revealed = field.revealed.copy()
+    revealed[x, y] = True
+    stack = [(x, y)]
+    while stack:
+        x, y = stack.pop()
+        if field.mine[x, y] or field.adjacent[x, y]:
+            continue
+        for dx, dy in NEIGHBOR_OFFSETS:
+            a, b = x + dx, y + dy
+            if 0 <= a < field.rows and 0 <= b < field.cols and not (revealed[a, b] or field.flagged[a, b]):
+                revealed[a, b] = True
+                stack.append((a, b))
+    return revealed
+
+
+@pytest.mark.parametrize("seed", range(12))
+def test_cascade_matches_flood_fill(seed):
+    rng = np.random.default_rng(seed)
+    rows, cols = int(rng.integers(1, 30)), int(rng.integers(1, 30))
+    field = MineField(rows, cols, rows * cols // 10, seed)
+    field.place_mines_post_first_click(int(rng.integers(rows)), int(rng.integers(cols)))
+    # flags, right or wrong, stop the cascade
+    for flat in rng.choice(rows * cols, rows * cols // 20, replace=False).tolist():
+        field.toggle_flag(*divmod(flat, cols))
+    for _ in range(5):
+        x, y = int(rng.integers(rows)), int(rng.integers(cols))
+        if field.mine[x, y]:
+            continue
+        expected = flood_fill(field, x, y) if not field.flagged[x, y] else field.revealed.copy()
+        before = field.revealed.copy()
+        changed = field.reveal(x, y)
+        assert np.array_equal(field.revealed, expected)
+        assert np.array_equal(np.sort(changed), np.flatnonzero(expected & ~before))
+        assert field.safe_remaining == (~field.mine & ~field.revealed).sum()
+
+
+@pytest.mark.parametrize("seed", range(12))
+def test_first_click_moves_mines_out_of_the_zone(seed):
+    rng = np.random.default_rng(seed)
+    rows, cols = int(rng.integers(3, 20)), int(rng.integers(3, 20))
+    x, y = int(rng.integers(rows)), int(rng.integers(cols))
+    zone = {(a, b) for a in range(x - 1, x + 2) for b in range(y - 1, y + 2) if 0 <= a < rows and 0 <= b < cols}
+    # up to a board with every tile outside the zone holding a mine
+    mines = int(rng.integers(rows * cols - len(zone) + 1))
+    field = MineField(rows, cols, mines, seed)
+    field.place_mines_post_first_click(x, y)
+    assert field.mine.sum() == mines
+    assert not any(field.mine[a, b] for a, b in zone)
+    assert np.array_equal(field.adjacent, field.count_adjacent())
@@ -0,0 +1,20 @@
+"""
+Tests of the window events, answered the same way by every loop of the game.
+"""
+
+import pygame
+
+import main
+
+
+def test_exposed_window_is_drawn_again():
+    game = main.PygameGame(9, 9, 10, seed=0, prepare_boards=False)
+    game.start_new_game()
+    for event_type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE):
+        game.full_redraw = False
+        game.handle_window_event(pygame.event.Event(event_type))
+        assert game.full_redraw
+        # the main loop hands its events to the same helper
+        game.full_redraw = False
+        game.handle_events([pygame.event.Event(event_type)])
+        assert game.full_redraw
@@ -0,0 +1,30 @@
+"""
+Tests of the probability engine: on boards small enough to list every layout of the mines,
+the probability of each tile is the share of the layouts with a mine on it.
+"""
+
+import numpy as np
+import pytest
+
+from probability import ProbabilityEngine
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_probabilities_match_enumeration(seed, partly_played, mine_layouts):
+    field = partly_played(seed)
+    expected = mine_layouts(field).mean(axis=0)
+    result = ProbabilityEngine(field).probabilities()
+    hidden = ~field.revealed
+    assert np.allclose(result[hidden], expected[hidden])
+    assert not result[field.revealed].any()
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_best_guess_is_least_likely_mine(seed, partly_played, mine_layouts):
+    field = partly_played(seed, reveals=0)
+    if field.won:
+        return
+    expected = mine_layouts(field).mean(axis=0)
+    x, y = ProbabilityEngine(field).best_guess()
+    assert not field.revealed[x, y]
+    assert np.isclose(expected[x, y], expected[~field.revealed].min())
@@ -0,0 +1,17 @@
+"""
+Tests of the profiler: timing the game and its board works for every kind of board.
+"""
+
+import main
+
+
+def test_profiling_an_endless_game():
+    # the endless board has no put_numbers, attaching must skip it
+    game = main.PygameGame(endless=True, profile=True)
+    game.start_new_game()
+    game.left_click_action(0, 0)
+    game.update_screen()
+    assert "EndlessGameBoard.reveal" in game.profiler.names
+    assert "EndlessGameBoard.put_numbers" not in game.profiler.names
+    game.toggle_profiler()
+    assert game.profiler is None
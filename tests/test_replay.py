@@ -0,0 +1,75 @@
+"""
+Tests of the replays: a recorded game played back ends on the same board.
+"""
+
+import numpy as np
+import pytest
+
+import main
+from engine import MineField
+from replay import FLAG, REVEAL, Recorder, Replay
+
+STATE = ("mine", "adjacent", "revealed", "flagged", "exploded", "wrong_flag")
+
+
+def assert_same_board(a, b):
+    for name in STATE:
+        assert np.array_equal(getattr(a, name), getattr(b, name)), name
+    assert (a.safe_remaining, a.flag_count, a.lost) == (b.safe_remaining, b.flag_count, b.lost)
+
+
+def recorded_game(seed, rows=16, cols=30, mines=99, mine_mask=None):
+    """
+    Plays a seeded game of random reveals and flags on a MineField while recording it.
+    """
+    field = MineField(rows, cols, mines, seed)
+    if mine_mask is not None:
+        field.set_mines(np.flatnonzero(mine_mask))
+        recorder = Recorder(rows, cols, mines, mine_mask=mine_mask)
+    else:
+        recorder = Recorder(rows, cols, mines, seed=seed)
+    rng = np.random.default_rng(seed)
+    time_ms = 0
+    while not (field.won or field.lost):
+        x, y = int(rng.integers(rows)), int(rng.integers(cols))
+        flag = bool(rng.random() < 0.3)
+        time_ms += int(rng.integers(50, 2000))
+        recorder.record(FLAG if flag else REVEAL, x, y, time_ms)
+        if not field.play_move(x, y, flag):
+            field.explode_mines()
+    return field, recorder
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_replay_ends_on_the_same_board(seed):
+    field, recorder = recorded_game(seed)
+    replay = Replay(bytes(recorder.buffer))
+    assert_same_board(replay.play(), field)
+    # one action at a time gives the same board
+    stepped = replay.new_field()
+    for i in range(len(replay)):
+        replay.apply(stepped, i)
+    assert_same_board(stepped, field)
+
+
+def test_replay_with_stored_mines():
+    layout = MineField(9, 9, 10, seed=4)
+    layout.lay_mines()
+    field, recorder = recorded_game(4, 9, 9, 10, mine_mask=layout.mine)
+    assert_same_board(Replay(bytes(recorder.buffer)).play(), field)
+
+
+def test_game_recording_replays_to_the_same_board(tmp_path):
+    path = str(tmp_path / "game.msr")
+    game = main.PygameGame(16, 16, 40, seed=7, record_path=path, prepare_boards=False)
+    game.start_new_game()
+    game.left_click_action(8, 8)
+    rng = np.random.default_rng(7)
+    for _ in range(20):
+        x, y = int(rng.integers(16)), int(rng.integers(16))
+        if game.board.mine[x, y]:
+            game.right_click_action(x, y)
+        else:
+            game.left_click_action(x, y)
+    game.recorder.save(path)
+    assert_same_board(Replay.load(path).play(), game.board)
@@ -0,0 +1,107 @@
+"""
+Tests of the save files: a game saved and loaded again has the same board.
+"""
+
+import numpy as np
+import pytest
+
+import main
+import savegame
+from engine import MineField
+from savegame import SaveFile
+
+
+def test_load_before_first_click_draws_the_board(tmp_path):
+    path = str(tmp_path / "game.mssv")
+    game = main.PygameGame(9, 9, 10, seed=1, save_path=path)
+    game.start_new_game()
+    game.save_game()
+    game.close_save()
+
+    loaded = main.PygameGame(9, 9, 10)
+    loaded.load_game(path)
+    assert not loaded.board.mines_placed
+    assert loaded.first_click
+    # the unrevealed tiles are drawn before the first click, as in a new game
+    assert loaded.board.lay_mine
+    assert loaded.board.make_board(loaded.screen, loaded.camera)
+    loaded.left_click_action(4, 4)
+    assert loaded.board.mines_placed
+    assert loaded.board.revealed[4, 4]
+    loaded.close_save()
+
+
+def test_resumed_board_reads_rows_on_demand(tmp_path, monkeypatch):
+    monkeypatch.setattr(savegame, "BAND_ROWS", 4)
+    path = str(tmp_path / "game.mssv")
+    field = MineField(40, 30, 250, seed=2)
+    field.place_mines_post_first_click(20, 15)
+    field.toggle_flag(0, 0)
+    SaveFile.create(path, field).close()
+
+    with SaveFile(path) as save:
+        resumed = MineField(40, 30, 250, seed=2)
+        save.load_into(resumed)
+        assert not save.loaded.any()
+        # the first cascade reads in the rows it reaches, and plays like the original board
+        assert np.array_equal(np.sort(resumed.reveal(20, 15)), np.sort(field.reveal(20, 15)))
+        assert resumed.safe_remaining == field.safe_remaining
+        assert resumed.source is save
+    # closing the file reads the rest of the board
+    assert resumed.source is None
+    for name in ("mine", "adjacent", "revealed", "flagged"):
+        assert np.array_equal(getattr(resumed, name), getattr(field, name)), name
+
+
+def assert_same_planes(a, b):
+    for name in savegame.PLANES + ("adjacent",):
+        assert np.array_equal(getattr(a, name), getattr(b, name)), name
+    assert (a.mines_placed, a.lost, a.flag_count, a.safe_remaining) == \
+        (b.mines_placed, b.lost, b.flag_count, b.safe_remaining)
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_save_and_load_give_the_same_planes(tmp_path, seed):
+    path = str(tmp_path / "game.mssv")
+    field = MineField(33, 21, 120, seed)
+    rng = np.random.default_rng(seed)
+    field.play_move(16, 10)
+    while not field.lost and rng.random() < 0.9:
+        x, y = int(rng.integers(33)), int(rng.integers(21))
+        if not field.play_move(x, y, bool(rng.random() < 0.4)):
+            # a lost game also saves its exploded mine and wrong flags
+            field.explode_mines()
+    SaveFile.create(path, field, 1234, {"tile_size": 16}).close()
+
+    with SaveFile(path) as save:
+        assert save.elapsed_ms == 1234
+        assert save.settings == {"tile_size": 16, "seed": seed}
+        loaded = MineField(save.rows, save.cols, save.num_mine, save.settings["seed"])
+        save.load_into(loaded)
+        loaded.need_rows(0, loaded.rows)
+    assert_same_planes(loaded, field)
+
+
+def test_incremental_saves_give_the_same_planes(tmp_path):
+    path = str(tmp_path / "game.mssv")
+    game = main.PygameGame(40, 30, 150, seed=3, save_path=path, prepare_boards=False)
+    game.start_new_game()
+    game.left_click_action(20, 15)
+    game.save_game()
+    rng = np.random.default_rng(3)
+    for _ in range(3):
+        # a few more moves, then a save that only rewrites the rows they changed
+        for _ in range(5):
+            x, y = int(rng.integers(40)), int(rng.integers(30))
+            if game.board.mine[x, y]:
+                game.right_click_action(x, y)
+            else:
+                game.left_click_action(x, y)
+        game.save_game()
+    game.close_save()
+
+    loaded = main.PygameGame(40, 30, 150, prepare_boards=False)
+    loaded.load_game(path)
+    loaded.board.need_rows(0, loaded.board.rows)
+    assert_same_planes(loaded.board, game.board)
+    loaded.close_save()
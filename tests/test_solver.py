@@ -0,0 +1,49 @@
+"""
+Tests of the solver: on boards small enough to list every layout of the mines,
+whatever it deduces holds in all of them.
+"""
+
+import numpy as np
+import pytest
+
+from engine import MineField
+from solver import Solver
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_deductions_hold_in_every_layout(seed, partly_played, mine_layouts):
+    field = partly_played(seed)
+    layouts = mine_layouts(field)
+    assert any(np.array_equal(layout, field.mine) for layout in layouts)
+    solver = Solver(field)
+    for x, y in solver.safe_moves():
+        assert not field.revealed[x, y]
+        assert not layouts[:, x, y].any()
+    for x, y in solver.certain_mines():
+        assert layouts[:, x, y].all()
+
+
+def test_single_clue_rules():
+    # the zeros at (0, 2) and (2, 0) free (1, 2) and (2, 1),
+    # which leaves the 1 at (1, 1) a single hidden neighbor: the mine
+    field = MineField(3, 3, 1, seed=0)
+    field.set_mines([8])
+    for x, y in [(0, 0), (0, 1), (1, 0), (1, 1), (0, 2), (2, 0)]:
+        field.set_revealed(x, y, True)
+    solver = Solver(field)
+    assert solver.certain_mines() == [(2, 2)]
+    assert solver.safe_moves() == [(1, 2), (2, 1)]
+
+
+def test_solve_stops_at_flagged_safe_tiles():
+    # (1, 2) is flagged but deduced safe when flags are not trusted: solve used to
+    # keep trying to uncover it forever
+    field = MineField(3, 3, 1, seed=0)
+    field.set_mines([6])
+    field.toggle_flag(1, 2)
+    field.reveal(0, 2)
+    solver = Solver(field, trust_flags=False)
+    assert not solver.solve()
+    assert solver.safe_moves() == [(1, 2)]
+    assert field.flagged[1, 2] and not field.revealed[1, 2]
+    assert field.safe_remaining == 1